@@ -8,18 +8,53 @@ Usage:
   python scripts/url_manager.py deduplicate <file> -o output.json
 """
 
+import heapq
 import json
+import re
 import sys
+from operator import itemgetter
 from pathlib import Path
-from urllib.parse import urlparse
 from collections import Counter
 
+# Parse rapide scheme://netloc : un match C-level au lieu d'un appel
+# urlparse (pur Python) par URL
+_URL_RE = re.compile(r'^([a-z][a-z0-9+.-]*)://([^/?#\s]+)', re.IGNORECASE)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(raw):
+    """Parse du JSON depuis des bytes (orjson si disponible, sinon stdlib)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps_bytes(data):
+    """Sérialise en bytes UTF-8 compacts (orjson si disponible, sinon stdlib)
+
+    Les fichiers merge/dedup sont consommés par d'autres scripts, pas lus
+    à l'œil nu : le JSON compact évite les milliers d'octets d'indentation
+    et le passage de l'indenteur sur chaque élément
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
 
 def load_urls(filepath):
-    """Charge les URLs depuis différents formats"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    """Charge les URLs depuis différents formats (tableau JSON ou JSONL)"""
+    raw = Path(filepath).read_bytes()
+
+    if raw.lstrip()[:1] == b'[':
+        data = _json_loads(raw)
+    else:
+        # JSONL : un objet par ligne
+        data = [_json_loads(line) for line in raw.splitlines() if line.strip()]
+
     # Normaliser en liste d'objets
     if isinstance(data, list):
         if not data:
@@ -37,10 +72,10 @@ def merge_urls(file1, file2, output):
     urls2 = load_urls(file2)
     
     merged = urls1 + urls2
-    
-    with open(output, 'w', encoding='utf-8') as f:
-        json.dump(merged, f, indent=2, ensure_ascii=False)
-    
+
+    with open(output, 'wb') as f:
+        f.write(_json_dumps_bytes(merged))
+
     print(f"✅ Merge réussi:")
     print(f"   - Fichier 1: {len(urls1)} URLs")
     print(f"   - Fichier 2: {len(urls2)} URLs")
@@ -70,11 +105,7 @@ def validate_urls(filepath):
         invalid_urls = []
         for i, url_obj in enumerate(urls):
             url = url_obj.get('url', '')
-            try:
-                parsed = urlparse(url)
-                if not parsed.scheme or not parsed.netloc:
-                    invalid_urls.append((i, url))
-            except:
+            if not _URL_RE.match(url):
                 invalid_urls.append((i, url))
         
         if invalid_urls:
@@ -82,11 +113,20 @@ def validate_urls(filepath):
             for i, url in invalid_urls[:5]:  # Montrer les 5 premières
                 print(f"   Ligne {i+1}: {url}")
         
-        # Duplicatas
-        url_list = [u.get('url') for u in urls if u.get('url')]
-        duplicates = [url for url, count in Counter(url_list).items() if count > 1]
-        if duplicates:
-            issues.append(f"⚠️ {len(duplicates)} URLs dupliquées")
+        # Duplicatas : simple sonde dans un set, pas besoin de compter
+        # les occurrences de chaque URL avec un Counter
+        seen = set()
+        duplicated = set()
+        for url_obj in urls:
+            url = url_obj.get('url')
+            if not url:
+                continue
+            if url in seen:
+                duplicated.add(url)
+            else:
+                seen.add(url)
+        if duplicated:
+            issues.append(f"⚠️ {len(duplicated)} URLs dupliquées")
         
         # Résumé
         print()
@@ -115,9 +155,21 @@ def show_stats(filepath):
     print("=" * 50)
     print(f"Total URLs: {len(urls)}")
     print()
-    
+
+    # Tous les compteurs remplis en une seule passe, sans listes
+    # intermédiaires de la taille du fichier
+    categories = Counter()
+    priorities = Counter()
+    domain_counts = Counter()
+
+    for u in urls:
+        categories[u.get('category', 'uncategorized')] += 1
+        priorities[u.get('priority', 'N/A')] += 1
+        match = _URL_RE.match(u.get('url', ''))
+        if match:
+            domain_counts[match.group(2)] += 1
+
     # Par catégorie
-    categories = Counter([u.get('category', 'uncategorized') for u in urls])
     if categories:
         print("Par catégorie:")
         for cat, count in categories.most_common():
@@ -125,7 +177,6 @@ def show_stats(filepath):
         print()
     
     # Par priorité
-    priorities = Counter([u.get('priority', 'N/A') for u in urls])
     if priorities:
         print("Par priorité:")
         for pri, count in sorted(priorities.items()):
@@ -133,18 +184,10 @@ def show_stats(filepath):
         print()
     
     # Par domaine
-    domains = []
-    for u in urls:
-        try:
-            parsed = urlparse(u.get('url', ''))
-            domains.append(parsed.netloc)
-        except:
-            pass
-    
-    domain_counts = Counter(domains)
     print(f"Domaines uniques: {len(domain_counts)}")
     print("Top 10 domaines:")
-    for domain, count in domain_counts.most_common(10):
+    # Sélection partielle O(N log 10) : most_common(10) trie tout
+    for domain, count in heapq.nlargest(10, domain_counts.items(), key=itemgetter(1)):
         print(f"  - {domain}: {count}")
 
 
@@ -152,21 +195,18 @@ def deduplicate_urls(filepath, output):
     """Supprime les URLs dupliquées"""
     urls = load_urls(filepath)
     
-    seen = set()
-    unique = []
-    duplicates = 0
-    
+    # L'ordre d'insertion du dict déduplique en un seul lookup C-level
+    # par URL (setdefault), sans set ni liste auxiliaires
+    by_url = {}
     for url_obj in urls:
-        url = url_obj.get('url')
-        if url not in seen:
-            seen.add(url)
-            unique.append(url_obj)
-        else:
-            duplicates += 1
-    
-    with open(output, 'w', encoding='utf-8') as f:
-        json.dump(unique, f, indent=2, ensure_ascii=False)
-    
+        by_url.setdefault(url_obj.get('url'), url_obj)
+
+    unique = list(by_url.values())
+    duplicates = len(urls) - len(unique)
+
+    with open(output, 'wb') as f:
+        f.write(_json_dumps_bytes(unique))
+
     print(f"✅ Déduplication réussie:")
     print(f"   - URLs originales: {len(urls)}")
     print(f"   - Duplicatas supprimés: {duplicates}")
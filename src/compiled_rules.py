@@ -0,0 +1,81 @@
+"""
+Validateurs Schema.org compilés par type
+
+Toutes les règles sont connues à l'import : chaque type est compilé en
+une fonction spécialisée. Les propriétés manquantes sont détectées par
+une unique différence d'ensembles C (frozenset - dict.keys()) contre
+les frozensets required/recommended figés dans la closure du checker ;
+les tests de @type restent déroulés en ligne droite avec les noms en
+littéraux. Pas de boucle générique sur les règles ni de lookups dict
+répétés.
+"""
+
+from .schema_rules import SCHEMA_RULES, get_schema_rules
+
+
+def _emit_checker_src(type_name, rule):
+    """
+    Génère le source du checker spécialisé pour un type
+
+    La fonction émise retourne (missing_required, missing_recommended,
+    type_mismatches), listes triées par nom de propriété pour des
+    messages et sorties déterministes. La détection des
+    manquantes est une différence d'ensembles (les frozensets _REQUIRED
+    et _RECOMMENDED sont injectés dans le namespace de compilation) :
+    un seul appel C par catégorie, quel que soit le nombre de règles
+    """
+    lines = ['def check(json_ld):']
+
+    lines.append('    keys = json_ld.keys()')
+    if rule['required']:
+        lines.append('    missing_required = sorted(_REQUIRED - keys)')
+    else:
+        lines.append('    missing_required = []')
+
+    if rule['recommended']:
+        lines.append('    missing_recommended = sorted(_RECOMMENDED - keys)')
+    else:
+        lines.append('    missing_recommended = []')
+
+    lines.append('    type_mismatches = []')
+    for prop, expected in sorted(rule['expected_types'].items()):
+        expected_sorted = sorted(expected)
+        lines.append(f'    value = json_ld.get({prop!r})')
+        lines.append("    if isinstance(value, dict) and '@type' in value:")
+        lines.append("        actual = value['@type']")
+        lines.append(f'        if actual not in {tuple(expected_sorted)!r}:')
+        lines.append(f'            type_mismatches.append('
+                     f'{{"property": {prop!r}, "expected": {expected_sorted!r}, "actual": actual}})')
+
+    lines.append('    return missing_required, missing_recommended, type_mismatches')
+    return '\n'.join(lines)
+
+
+def _compile(type_name, rule):
+    """Compile le source émis en fonction exécutable"""
+    namespace = {
+        '_REQUIRED': rule['required'],
+        '_RECOMMENDED': rule['recommended'],
+    }
+    exec(compile(_emit_checker_src(type_name, rule), f'<rules:{type_name}>', 'exec'), namespace)
+    return namespace['check']
+
+
+# Tous les checkers sont compilés une fois à l'import
+_COMPILED = {
+    schema_type: _compile(schema_type, rule)
+    for schema_type, rule in SCHEMA_RULES.items()
+}
+
+
+def get_checker(schema_type):
+    """
+    Checker compilé pour un type donné (même fallback que get_schema_rules)
+    """
+    checker = _COMPILED.get(schema_type)
+    if checker is not None:
+        return checker
+
+    if get_schema_rules(schema_type) is SCHEMA_RULES['CreativeWork']:
+        return _COMPILED['CreativeWork']
+    return _COMPILED['Thing']
@@ -5,6 +5,10 @@ Configuration centralisée pour le validateur JSON-LD
 # === VALIDATION PARAMETERS ===
 MIN_SCORE_THRESHOLD = 80  # Score minimum pour acceptation (0-100)
 
+# Score à partir duquel un bloc accepté court-circuite le scoring des
+# blocs restants de la même page
+EARLY_ACCEPT_THRESHOLD = 95
+
 # === SCORING WEIGHTS (total = 100%) ===
 WEIGHTS = {
     'syntax_validation': 15,      # JSON valide + structure base
@@ -33,6 +37,10 @@ REQUEST_TIMEOUT = 15  # secondes max par URL
 RATE_LIMIT_DELAY = 2  # secondes entre chaque requête
 MAX_RETRIES = 2       # nombre de tentatives si échec
 
+# Troncature du HTML téléchargé : les JSON-LD vivent dans le <head> ou
+# en tête de <body>, inutile de télécharger et parser des pages entières
+MAX_HTML_BYTES = 512 * 1024
+
 USER_AGENT = 'AIDatasetBot/1.0 (JSON-LD Quality Dataset; +https://github.com/yourname/json-ld-validator)'
 
 # Headers pour les requêtes
@@ -66,11 +74,22 @@ QUALITY_SAME_AS_SOURCES = [
 
 # === OUTPUT SETTINGS ===
 OUTPUT_DIR = 'output'
+WRITE_BATCH_SIZE = 1000  # Lignes JSONL regroupées en un seul write()
 ACCEPTED_FILE = f'{OUTPUT_DIR}/accepted_local.jsonl'
 REJECTED_FILE = f'{OUTPUT_DIR}/rejected_local.jsonl'
 REPORT_FILE = f'{OUTPUT_DIR}/validation_report.md'
 DETAILED_REPORT_FILE = f'{OUTPUT_DIR}/detailed_report.json'
 
+# === CONCURRENCY ===
+# URLs traitées en parallèle : le pipeline est dominé par la latence
+# réseau (DNS + TCP + TLS + RTT), le scoring reste léger en CPU
+VALIDATION_MAX_WORKERS = 8
+
+# Processus dédiés au scoring (0 = scoring inline dans le thread de
+# traitement). Utile quand les workers réseau saturent le GIL avec des
+# pages à plusieurs dizaines de blocs JSON-LD
+SCORING_PROCESSES = 0
+
 # === ROBOTS.TXT ===
 RESPECT_ROBOTS_TXT = True
 ROBOTS_CACHE_DURATION = 3600  # 1 heure en cache
@@ -81,4 +100,5 @@ LOG_FILE = f'{OUTPUT_DIR}/scraping.log'
 
 # === PROGRESS TRACKING ===
 CHECKPOINT_INTERVAL = 100  # Sauvegarde tous les 100 URLs
+CHECKPOINT_FILE = f'{OUTPUT_DIR}/checkpoint.jsonl'  # Append-only
 ENABLE_PROGRESS_BAR = True
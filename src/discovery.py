@@ -3,16 +3,36 @@ Workflow 0 : Discovery - Script principal
 Découvre et score les meilleures URLs depuis le fichier domains_master.json
 """
 
+import heapq
 import json
 import logging
+import os
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict, is_dataclass
+from operator import attrgetter
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 from tqdm import tqdm
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from .discovery_config import (
     TARGET_TOTAL_URLS,
     MAX_URLS_PER_TIER,
@@ -20,10 +40,14 @@ from .discovery_config import (
     DISCOVERY_REPORT_FILE,
     DISCOVERY_LOG_FILE,
     DISCOVERY_CHECKPOINT_FILE,
+    DISCOVERY_CHECKPOINT_MANIFEST,
     DISCOVERY_CHECKPOINT_INTERVAL,
     DISCOVERY_LOG_LEVEL,
     ENABLE_DISCOVERY_PROGRESS,
     DISCOVERY_RATE_LIMIT,
+    DISCOVERY_MAX_WORKERS,
+    DISCOVERY_SCORING_PROCESSES,
+    DOMAINS_STREAM_THRESHOLD_MB,
     MIN_PRE_SCORE
 )
 from .config import REQUEST_HEADERS
@@ -48,14 +72,71 @@ def setup_discovery_logging():
 
 logger = logging.getLogger(__name__)
 
+# Pool de processus pour le scoring, créé par main_discovery si
+# DISCOVERY_SCORING_PROCESSES > 0 (le scoring est du pur Python soumis
+# au GIL, contrairement aux fetchs réseau des threads de discovery)
+_scoring_executor = None
+
+
+@dataclass(slots=True)
+class UrlRecord:
+    """
+    Enregistrement d'une URL découverte
+
+    Accès aux champs par offset fixe (slots) au lieu d'un hash de clé
+    par dict.get : plus rapide dans les boucles de rapport/checkpoint
+    et ~40% plus compact en mémoire
+    """
+    url: str
+    pre_score: float
+    breakdown: Dict
+    content_type: str
+    should_exclude: bool
+    lastmod: str
+    source: str
+    domain: str
+    tier: str
+    language: str
+    category: str
+    expected_schema_types: List = field(default_factory=list)
+
+
+def _json_loads(raw: bytes):
+    """Parse du JSON depuis des bytes (orjson si disponible, sinon stdlib)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _jsonl_line(obj) -> bytes:
+    """Sérialise un objet en une ligne JSONL compacte (bytes UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    if is_dataclass(obj):
+        obj = asdict(obj)
+    return (json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
 
 def load_domains_master(filepath: str) -> Dict:
     """Charge le fichier domains_master.json"""
     logger.info(f"Chargement de {filepath}...")
     
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    size_mb = Path(filepath).stat().st_size / (1024 * 1024)
+
+    if ijson is not None and size_mb > DOMAINS_STREAM_THRESHOLD_MB:
+        # Gros fichier : parse en streaming, catégorie par catégorie,
+        # sans garder le buffer brut et le document parsé en même temps
+        logger.info(f"   Fichier de {size_mb:.0f} MB, parsing en streaming (ijson)")
+        categories = {}
+        with open(filepath, 'rb') as f:
+            for category_name, category_data in ijson.kvitems(f, 'categories'):
+                categories[category_name] = category_data
+        data = {'categories': categories}
+    else:
+        # Lecture en un seul appel système puis parse sur un buffer contigu
+        # (évite les petites lectures décodées du TextIOWrapper)
+        data = _json_loads(Path(filepath).read_bytes())
+
     # Compter les domaines par tier
     tier_counts = defaultdict(int)
     total_domains = 0
@@ -78,10 +159,10 @@ def process_single_domain(
     domain_data: Dict,
     category_config: Dict,
     category_name: str
-) -> List[Dict]:
+) -> List[UrlRecord]:
     """
     Traite un domaine : découvre et score les URLs
-    
+
     Returns:
         Liste des URLs découvertes et scorées
     """
@@ -121,60 +202,89 @@ def process_single_domain(
     
     # 3. Scorer et filtrer les URLs
     logger.info("🎯 Scoring et filtrage...")
-    scored_urls = score_and_filter_urls(
-        discovered_urls,
-        category_patterns=category_patterns,
-        min_score=MIN_PRE_SCORE,
-        max_urls=max_urls_for_tier
-    )
+    if _scoring_executor is not None:
+        scored_urls = _scoring_executor.submit(
+            score_and_filter_urls,
+            discovered_urls,
+            category_patterns=category_patterns,
+            min_score=MIN_PRE_SCORE,
+            max_urls=max_urls_for_tier
+        ).result()
+    else:
+        scored_urls = score_and_filter_urls(
+            discovered_urls,
+            category_patterns=category_patterns,
+            min_score=MIN_PRE_SCORE,
+            max_urls=max_urls_for_tier
+        )
     
     if not scored_urls:
         logger.warning(f"⚠️  Aucune URL n'a passé le filtrage (min_score={MIN_PRE_SCORE})")
         return []
     
     # 4. Enrichir avec les métadonnées du domaine
-    for url_data in scored_urls:
-        url_data.update({
-            'domain': domain_url,
-            'tier': tier,
-            'language': language,
-            'category': category_name,
-            'expected_schema_types': category_config.get('expected_schema_types', [])
-        })
-    
+    expected_schema_types = category_config.get('expected_schema_types', [])
+    records = [
+        UrlRecord(
+            domain=domain_url,
+            tier=tier,
+            language=language,
+            category=category_name,
+            expected_schema_types=expected_schema_types,
+            **url_data
+        )
+        for url_data in scored_urls
+    ]
+
     # Afficher quelques stats
-    avg_score = sum(u['pre_score'] for u in scored_urls) / len(scored_urls)
+    avg_score = sum(u.pre_score for u in records) / len(records)
     content_types = defaultdict(int)
-    for u in scored_urls:
-        content_types[u['content_type']] += 1
+    for u in records:
+        content_types[u.content_type] += 1
     
-    logger.info(f"✅ {len(scored_urls)} URLs sélectionnées")
+    logger.info(f"✅ {len(records)} URLs sélectionnées")
     logger.info(f"   Score moyen: {avg_score:.1f}/100")
     logger.info(f"   Types détectés: {dict(content_types)}")
-    
+
     # Respect rate limit
     time.sleep(DISCOVERY_RATE_LIMIT)
-    
-    return scored_urls
 
+    return records
 
-def save_checkpoint(all_discovered_urls: List[Dict], processed_count: int):
-    """Sauvegarde un checkpoint"""
-    checkpoint_data = {
+
+def save_checkpoint(all_discovered_urls: List[UrlRecord], processed_count: int, start_index: int = 0) -> int:
+    """
+    Sauvegarde un checkpoint : n'append que les URLs découvertes
+    depuis le checkpoint précédent (coût O(Δ) au lieu de O(N))
+
+    Returns:
+        Index de reprise pour le prochain checkpoint
+    """
+    with open(DISCOVERY_CHECKPOINT_FILE, 'ab') as f:
+        for record in all_discovered_urls[start_index:]:
+            f.write(_jsonl_line(record))
+        # Forcer l'écriture sur disque : le checkpoint doit survivre à un
+        # crash du process, pas seulement rester dans le page cache
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Le manifeste ne contient que les métadonnées : sa réécriture reste
+    # de taille constante quelle que soit la progression
+    manifest = {
         'timestamp': datetime.utcnow().isoformat() + 'Z',
         'processed_domains': processed_count,
         'total_urls': len(all_discovered_urls),
-        'urls': all_discovered_urls
+        'checkpoint_file': DISCOVERY_CHECKPOINT_FILE
     }
-    
-    with open(DISCOVERY_CHECKPOINT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
-    
+    with open(DISCOVERY_CHECKPOINT_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
     logger.info(f"💾 Checkpoint sauvegardé: {processed_count} domaines, {len(all_discovered_urls)} URLs")
+    return len(all_discovered_urls)
 
 
 def generate_discovery_report(
-    all_discovered_urls: List[Dict],
+    all_discovered_urls: List[UrlRecord],
     total_domains: int,
     start_time: datetime,
     end_time: datetime
@@ -182,35 +292,53 @@ def generate_discovery_report(
     """Génère le rapport Markdown de discovery"""
     
     duration = end_time - start_time
-    
-    # Stats par tier
-    tier_stats = defaultdict(lambda: {'domains': 0, 'urls': 0, 'avg_score': []})
-    for url_data in all_discovered_urls:
-        tier = url_data.get('tier', 'standard')
-        tier_stats[tier]['urls'] += 1
-        tier_stats[tier]['avg_score'].append(url_data.get('pre_score', 0))
-    
-    # Stats par catégorie
+
+    # Tous les agrégats (tier, catégorie, langue, type, buckets de score,
+    # somme des scores) sont calculés en une seule passe sur la liste
+    tier_stats = defaultdict(lambda: {'urls': 0, 'score_sum': 0.0, 'domains': set()})
     category_stats = defaultdict(lambda: {'urls': 0, 'domains': set()})
-    for url_data in all_discovered_urls:
-        cat = url_data.get('category', 'unknown')
-        category_stats[cat]['urls'] += 1
-        category_stats[cat]['domains'].add(url_data.get('domain', ''))
-    
-    # Stats par langue
     lang_stats = defaultdict(int)
-    for url_data in all_discovered_urls:
-        lang = url_data.get('language', 'en')
-        lang_stats[lang] += 1
-    
-    # Stats par type de contenu
     content_type_stats = defaultdict(int)
+
     for url_data in all_discovered_urls:
-        ctype = url_data.get('content_type', 'unknown')
-        content_type_stats[ctype] += 1
-    
-    # Génération rapport
-    report = f"""# 🔍 Discovery Report - Workflow 0
+        score = url_data.pre_score
+        domain = url_data.domain
+
+        stats = tier_stats[url_data.tier]
+        stats['urls'] += 1
+        stats['score_sum'] += score
+        stats['domains'].add(domain)
+
+        stats = category_stats[url_data.category]
+        stats['urls'] += 1
+        stats['domains'].add(domain)
+
+        lang_stats[url_data.language] += 1
+        content_type_stats[url_data.content_type] += 1
+
+    # Stats numériques (somme + histogramme par tranches de 10) :
+    # vectorisées en un passage C via NumPy si disponible
+    n_urls = len(all_discovered_urls)
+    if np is not None and n_urls:
+        scores = np.fromiter(
+            (u.pre_score for u in all_discovered_urls), dtype=np.float32, count=n_urls
+        )
+        total_score = float(scores.sum())
+        hist, _ = np.histogram(scores, bins=np.arange(0, 120, 10))
+        score_buckets = {b: int(c) for b, c in zip(range(0, 110, 10), hist) if c}
+    else:
+        total_score = 0.0
+        score_buckets = defaultdict(int)
+        for url_data in all_discovered_urls:
+            total_score += url_data.pre_score
+            score_buckets[int(url_data.pre_score // 10) * 10] += 1
+
+    # Top 20 : sélection partielle O(N log 20) au lieu d'un tri complet
+    top_urls = heapq.nlargest(20, all_discovered_urls, key=attrgetter('pre_score'))
+
+    # Génération rapport : fragments accumulés puis un seul join
+    # (évite la réallocation O(N²) des report += successifs)
+    parts = [f"""# 🔍 Discovery Report - Workflow 0
 
 **Generated:** {end_time.strftime('%Y-%m-%d %H:%M:%S UTC')}  
 **Duration:** {duration.total_seconds() / 60:.1f} minutes
@@ -223,7 +351,7 @@ def generate_discovery_report(
 |--------|-------|
 | **Total Domains Processed** | {total_domains} |
 | **Total URLs Discovered** | {len(all_discovered_urls)} |
-| **Average Pre-Score** | {sum(u['pre_score'] for u in all_discovered_urls) / len(all_discovered_urls):.1f}/100 |
+| **Average Pre-Score** | {total_score / len(all_discovered_urls):.1f}/100 |
 | **Target Met** | {'✅ YES' if len(all_discovered_urls) >= TARGET_TOTAL_URLS * 0.9 else '⚠️ PARTIAL'} |
 
 ---
@@ -232,72 +360,69 @@ def generate_discovery_report(
 
 | Tier | URLs | Avg Score | Domains |
 |------|------|-----------|---------|
-"""
-    
+"""]
+
     for tier in ['gold', 'high', 'standard']:
         stats = tier_stats[tier]
         if stats['urls'] > 0:
-            avg = sum(stats['avg_score']) / len(stats['avg_score'])
-            # Compter domaines uniques
-            unique_domains = len(set(u['domain'] for u in all_discovered_urls if u.get('tier') == tier))
-            report += f"| {tier.upper()} | {stats['urls']} | {avg:.1f}/100 | {unique_domains} |\n"
+            avg = stats['score_sum'] / stats['urls']
+            parts.append(f"| {tier.upper()} | {stats['urls']} | {avg:.1f}/100 | {len(stats['domains'])} |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🌍 URLs by Language
 
 | Language | URLs | Percentage |
 |----------|------|------------|
-"""
+""")
     
     total_urls = len(all_discovered_urls)
     for lang, count in sorted(lang_stats.items(), key=lambda x: x[1], reverse=True):
         pct = count / total_urls * 100
-        report += f"| {lang.upper()} | {count} | {pct:.1f}% |\n"
+        parts.append(f"| {lang.upper()} | {count} | {pct:.1f}% |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 📂 URLs by Category (Top 10)
 
 | Category | URLs | Domains |
 |----------|------|---------|
-"""
+""")
     
     sorted_cats = sorted(category_stats.items(), key=lambda x: x[1]['urls'], reverse=True)[:10]
     for cat, stats in sorted_cats:
-        report += f"| {cat} | {stats['urls']} | {len(stats['domains'])} |\n"
+        parts.append(f"| {cat} | {stats['urls']} | {len(stats['domains'])} |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🎨 URLs by Content Type
 
 | Content Type | Count | Percentage |
 |--------------|-------|------------|
-"""
+""")
     
     for ctype, count in sorted(content_type_stats.items(), key=lambda x: x[1], reverse=True):
         pct = count / total_urls * 100
-        report += f"| {ctype} | {count} | {pct:.1f}% |\n"
+        parts.append(f"| {ctype} | {count} | {pct:.1f}% |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🏆 Top 20 Highest Scoring URLs
 
 | Rank | Score | Content Type | URL |
 |------|-------|--------------|-----|
-"""
+""")
     
-    top_urls = sorted(all_discovered_urls, key=lambda x: x['pre_score'], reverse=True)[:20]
     for i, url_data in enumerate(top_urls, 1):
-        url = url_data['url']
+        url = url_data.url
         display_url = url[:60] + '...' if len(url) > 60 else url
-        report += f"| {i} | {url_data['pre_score']:.1f} | {url_data['content_type']} | {display_url} |\n"
+        parts.append(f"| {i} | {url_data.pre_score:.1f} | {url_data.content_type} | {display_url} |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 📁 Output Files
@@ -310,21 +435,14 @@ def generate_discovery_report(
 
 ## 📈 Score Distribution
 
-"""
-    
-    # Distribution des scores
-    score_buckets = defaultdict(int)
-    for u in all_discovered_urls:
-        score = u['pre_score']
-        bucket = int(score // 10) * 10
-        score_buckets[bucket] += 1
+""")
     
     for bucket in sorted(score_buckets.keys(), reverse=True):
         count = score_buckets[bucket]
         bar = '█' * int(count / max(score_buckets.values()) * 50)
-        report += f"{bucket}-{bucket+9} | {bar} {count}\n"
+        parts.append(f"{bucket}-{bucket+9} | {bar} {count}\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🚀 Next Steps
@@ -339,11 +457,11 @@ def generate_discovery_report(
 ---
 
 *Report generated by Discovery Workflow v1.0*
-"""
+""")
     
-    # Sauvegarder
-    with open(DISCOVERY_REPORT_FILE, 'w', encoding='utf-8') as f:
-        f.write(report)
+    # Sauvegarder (même tampon de 1 Mo que le dump des URLs)
+    with open(DISCOVERY_REPORT_FILE, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(''.join(parts))
     
     logger.info(f"✅ Rapport sauvegardé: {DISCOVERY_REPORT_FILE}")
 
@@ -359,7 +477,12 @@ def main_discovery(domains_file: str):
     logger.info("=" * 70)
     
     start_time = datetime.utcnow()
-    
+
+    global _scoring_executor
+    if DISCOVERY_SCORING_PROCESSES > 0:
+        _scoring_executor = ProcessPoolExecutor(max_workers=DISCOVERY_SCORING_PROCESSES)
+        logger.info(f"⚙️  Scoring délégué à {DISCOVERY_SCORING_PROCESSES} processus")
+
     # 1. Charger les domaines
     domains_data = load_domains_master(domains_file)
     
@@ -369,6 +492,11 @@ def main_discovery(domains_file: str):
     
     total_domains = sum(len(cat.get('domains', [])) for cat in categories.values())
     processed_count = 0
+    checkpoint_index = 0
+
+    # Repartir d'un checkpoint vide (le fichier est en mode append)
+    Path(DISCOVERY_CHECKPOINT_FILE).parent.mkdir(parents=True, exist_ok=True)
+    Path(DISCOVERY_CHECKPOINT_FILE).unlink(missing_ok=True)
     
     logger.info(f"\n🎯 Objectif: {TARGET_TOTAL_URLS} URLs à découvrir depuis {total_domains} domaines")
     logger.info("")
@@ -386,31 +514,44 @@ def main_discovery(domains_file: str):
         logger.info(f"   {len(domains)} domaines à traiter")
         logger.info('#'*70)
         
-        # Iterator avec ou sans barre de progression
-        domain_iter = enumerate(domains, 1)
-        if ENABLE_DISCOVERY_PROGRESS:
-            domain_iter = tqdm(domain_iter, total=len(domains), desc=f"{category_name}")
-        
-        # Traiter chaque domaine
-        for i, domain_data in domain_iter:
-            try:
-                urls = process_single_domain(domain_data, category_data, category_name)
-                all_discovered_urls.extend(urls)
-                processed_count += 1
-                
-                # Checkpoint périodique
-                if processed_count % DISCOVERY_CHECKPOINT_INTERVAL == 0:
-                    save_checkpoint(all_discovered_urls, processed_count)
-                
-                # Vérifier si on a atteint l'objectif
-                if len(all_discovered_urls) >= TARGET_TOTAL_URLS:
-                    logger.info(f"\n🎯 Objectif atteint: {len(all_discovered_urls)} URLs !")
-                    break
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur traitement {domain_data.get('url', 'unknown')}: {e}")
-                continue
-        
+        # Traiter les domaines en parallèle : le temps est dominé par la
+        # latence réseau des sitemaps, chaque domaine garde son rate limit
+        with ThreadPoolExecutor(max_workers=DISCOVERY_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    process_single_domain, domain_data, category_data, category_name
+                ): domain_data
+                for domain_data in domains
+            }
+
+            future_iter = as_completed(futures)
+            if ENABLE_DISCOVERY_PROGRESS:
+                future_iter = tqdm(future_iter, total=len(domains), desc=f"{category_name}")
+
+            for future in future_iter:
+                domain_data = futures[future]
+                try:
+                    urls = future.result()
+                    all_discovered_urls.extend(urls)
+                    processed_count += 1
+
+                    # Checkpoint périodique
+                    if processed_count % DISCOVERY_CHECKPOINT_INTERVAL == 0:
+                        checkpoint_index = save_checkpoint(
+                            all_discovered_urls, processed_count, checkpoint_index
+                        )
+
+                    # Vérifier si on a atteint l'objectif
+                    if len(all_discovered_urls) >= TARGET_TOTAL_URLS:
+                        logger.info(f"\n🎯 Objectif atteint: {len(all_discovered_urls)} URLs !")
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+                except Exception as e:
+                    logger.error(f"❌ Erreur traitement {domain_data.get('url', 'unknown')}: {e}")
+                    continue
+
         if len(all_discovered_urls) >= TARGET_TOTAL_URLS:
             break
     
@@ -421,9 +562,14 @@ def main_discovery(domains_file: str):
     # Sauvegarder le fichier final
     Path(DISCOVERED_URLS_FILE).parent.mkdir(parents=True, exist_ok=True)
     
-    with open(DISCOVERED_URLS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_discovered_urls, f, indent=2, ensure_ascii=False)
-    
+    # JSONL : un objet par ligne, pas d'indentation — le Workflow 1
+    # peut streamer le fichier au lieu de parser un tableau géant.
+    # Tampon de 1 Mo : un write() par ligne sinon, soit des milliers
+    # de syscalls pour le dump final
+    with open(DISCOVERED_URLS_FILE, 'wb', buffering=1 << 20) as f:
+        for url_data in all_discovered_urls:
+            f.write(_jsonl_line(url_data))
+
     logger.info(f"✅ {len(all_discovered_urls)} URLs sauvegardées: {DISCOVERED_URLS_FILE}")
     
     # 5. Générer le rapport
@@ -451,7 +597,11 @@ def main_discovery(domains_file: str):
     logger.info(f"🚀 Prochaine étape: Workflow 1 (Validation)")
     logger.info(f"   python -m src.main {DISCOVERED_URLS_FILE}")
     logger.info('='*70)
-    
+
+    if _scoring_executor is not None:
+        _scoring_executor.shutdown()
+        _scoring_executor = None
+
     return 0
 
 
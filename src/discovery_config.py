@@ -2,6 +2,8 @@
 Configuration pour le Workflow 0 - Discovery
 """
 
+import re
+
 # === DISCOVERY TARGETS ===
 TARGET_TOTAL_URLS = 3500  # Objectif total d'URLs à découvrir
 MAX_URLS_PER_TIER = {
@@ -28,6 +30,10 @@ SITEMAP_COMMON_PATHS = [
 # Taille max d'un sitemap à parser (éviter les sitemaps géants)
 MAX_SITEMAP_SIZE_MB = 50
 
+# Au-delà de cette taille, domains_master.json est parsé en streaming
+# (ijson) au lieu d'être chargé d'un bloc
+DOMAINS_STREAM_THRESHOLD_MB = 50
+
 # === URL PRE-SCORING ===
 # Patterns universels prioritaires (tous sites)
 UNIVERSAL_PRIORITY_PATTERNS = [
@@ -72,6 +78,17 @@ IGNORE_EXTENSIONS = [
     '.css', '.js', '.xml', '.json'
 ]
 
+# === COMPILED PATTERNS ===
+# Unions précompilées des listes ci-dessus : un seul scan C-level par URL
+# au lieu d'une boucle Python `any(p in url for p in patterns)` par liste
+EXCLUDE_RE = re.compile('|'.join(map(re.escape, EXCLUDE_PATTERNS)))
+IGNORE_EXTENSIONS_RE = re.compile('(?:' + '|'.join(map(re.escape, IGNORE_EXTENSIONS)) + r')$')
+UNIVERSAL_PRIORITY_RE = re.compile('|'.join(map(re.escape, UNIVERSAL_PRIORITY_PATTERNS)))
+CONTENT_TYPE_RES = {
+    content_type: re.compile('|'.join(map(re.escape, patterns)))
+    for content_type, patterns in CONTENT_TYPE_PATTERNS.items()
+}
+
 # === URL DEPTH ===
 # Profondeur optimale dans l'arborescence du site
 OPTIMAL_DEPTH_MIN = 1  # Ex: /article (pas la homepage)
@@ -81,14 +98,27 @@ OPTIMAL_DEPTH_MAX = 4  # Ex: /category/subcategory/article
 DISCOVERY_RATE_LIMIT = 1  # secondes entre requêtes (plus rapide que le scraping)
 DISCOVERY_TIMEOUT = 10    # secondes max par requête
 
+# === CONCURRENCY ===
+# Domaines analysés en parallèle : le discovery est dominé par la latence
+# réseau, chaque domaine reste limité par DISCOVERY_RATE_LIMIT
+DISCOVERY_MAX_WORKERS = 8
+
+# Processus dédiés au scoring des URLs (0 = scoring inline dans le thread
+# de discovery). Utile quand les workers réseau saturent le GIL avec des
+# sitemaps de dizaines de milliers d'URLs
+DISCOVERY_SCORING_PROCESSES = 0
+
 # === OUTPUT ===
-DISCOVERED_URLS_FILE = 'data/discovered_urls.json'
+DISCOVERED_URLS_FILE = 'data/discovered_urls.jsonl'  # JSONL : un objet par ligne
 DISCOVERY_REPORT_FILE = 'output/discovery_report.md'
 DISCOVERY_LOG_FILE = 'output/discovery.log'
 
 # === CHECKPOINTING ===
 DISCOVERY_CHECKPOINT_INTERVAL = 20  # Sauvegarder tous les 20 domaines
-DISCOVERY_CHECKPOINT_FILE = 'output/discovery_checkpoint.json'
+DISCOVERY_CHECKPOINT_FILE = 'output/discovery_checkpoint.jsonl'  # Append-only
+# Petit manifeste réécrit à chaque checkpoint (métadonnées uniquement,
+# les URLs restent dans le log append-only ci-dessus)
+DISCOVERY_CHECKPOINT_MANIFEST = 'output/discovery_checkpoint_manifest.json'
 
 # === PRE-SCORING WEIGHTS ===
 # Score de 0-100 pour prioriser les URLs avant scraping
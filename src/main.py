@@ -2,45 +2,128 @@
 Script principal d'orchestration de la validation JSON-LD
 """
 
+import atexit
 import json
 import logging
+import mmap
 import os
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from hashlib import blake2b
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from tqdm import tqdm
 
+try:
+    import orjson  # Encode/décode 3-10x plus vite que le json stdlib
+except ImportError:
+    orjson = None
+
 from .config import (
-    OUTPUT_DIR, ACCEPTED_FILE, REJECTED_FILE, 
+    OUTPUT_DIR, ACCEPTED_FILE, REJECTED_FILE,
     REPORT_FILE, DETAILED_REPORT_FILE,
     LOG_FILE, LOG_LEVEL, CHECKPOINT_INTERVAL,
-    ENABLE_PROGRESS_BAR
+    ENABLE_PROGRESS_BAR, VALIDATION_MAX_WORKERS,
+    WRITE_BATCH_SIZE, CHECKPOINT_FILE, SCORING_PROCESSES,
+    EARLY_ACCEPT_THRESHOLD
 )
 from .scraper import scrape_url
 from .scorer import score_json_ld
+from .validator import serializable_details
 from .reporter import save_reports
 
 
 # Configuration du logging
 def setup_logging():
-    """Configure le système de logging"""
+    """
+    Configure le système de logging
+
+    Les handlers fichier + stdout sont placés derrière un QueueHandler :
+    les logger.info/error du chemin chaud ne font qu'empiler un
+    LogRecord, les écritures disque/terminal (et leur verrou) sont
+    déportées dans le thread du QueueListener
+    """
     # Créer le dossier output si nécessaire
     Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-    
-    # Configuration
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+
+    root = logging.getLogger()
+    if root.handlers:
+        # Déjà configuré (même sémantique que basicConfig)
+        return
+
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    queue = Queue(-1)
+    root.setLevel(getattr(logging, LOG_LEVEL))
+    root.addHandler(QueueHandler(queue))
+
+    listener = QueueListener(queue, file_handler, stream_handler)
+    listener.start()
+    # Drainer la queue et fermer les handlers à la sortie du programme
+    atexit.register(listener.stop)
 
 
 logger = logging.getLogger(__name__)
 
+# Pool de processus pour le scoring (créé par main() si
+# SCORING_PROCESSES > 0, sinon le scoring reste inline)
+_scoring_executor = None
+
+
+def _json_loads(raw: bytes):
+    """Parse du JSON depuis des bytes (orjson si disponible, sinon stdlib)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _jsonl_line(obj) -> bytes:
+    """Sérialise un objet en une ligne JSONL compacte (bytes UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _canonical_payload(json_ld: Dict) -> bytes:
+    """
+    Forme canonique (clés triées) d'un bloc JSON-LD, en bytes
+
+    Les pages embarquent souvent le même bloc à plusieurs positions ;
+    l'empreinte de cette forme permet de ne le scorer qu'une fois, et sa
+    taille sert d'heuristique de richesse pour l'ordre de scoring
+    """
+    if orjson is not None:
+        return orjson.dumps(json_ld, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(json_ld, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _canonical_url(url: str) -> str:
+    """
+    Forme canonique d'une URL pour la déduplication
+
+    Hôte en minuscules, ports par défaut retirés, paramètres de requête
+    triés, slash final et fragment ignorés : deux écritures du même
+    document donnent la même clé
+    """
+    try:
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or '').lower()
+        port = parts.port
+        if port and port not in (80, 443):
+            host = f"{host}:{port}"
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip('/') or '/', query, ''))
+    except ValueError:
+        return url.strip()
+
 
 def load_urls(input_file: str) -> List[Dict]:
     """
@@ -55,12 +138,34 @@ def load_urls(input_file: str) -> List[Dict]:
     
     ou simplement:
     ["https://example.com", "https://example2.com", ...]
+
+    ou du JSONL (un objet par ligne), comme produit par le Workflow 0
     """
     logger.info(f"Chargement des URLs depuis {input_file}")
-    
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+
+    with open(input_file, 'rb') as f:
+        # Sonder le premier octet significatif pour détecter le format
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        f.seek(0)
+
+        if head == b'[':
+            # Tableau JSON : mmap évite la copie intermédiaire du
+            # fichier entier dans un objet bytes avant le parse
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if orjson is not None:
+                    data = orjson.loads(memoryview(mm))
+                else:
+                    data = json.loads(mm[:])
+            finally:
+                mm.close()
+        else:
+            # JSONL : un objet par ligne, parsé au fil de la lecture —
+            # le fichier brut n'est jamais résident en entier
+            data = [_json_loads(line) for line in f if line.strip()]
+
     # Normaliser le format
     if isinstance(data, list):
         if len(data) == 0:
@@ -73,11 +178,79 @@ def load_urls(input_file: str) -> List[Dict]:
             urls = data
     else:
         raise ValueError("Format d'entrée invalide. Attendu: liste de strings ou liste d'objets")
-    
+
+    # Dédupliquer avant de dispatcher : chaque duplicata coûterait un
+    # aller-retour HTTP et un scoring complets
+    seen = set()
+    unique_urls = []
+    for url_data in urls:
+        key = _canonical_url(url_data.get('url', ''))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_urls.append(url_data)
+
+    if len(unique_urls) < len(urls):
+        logger.info(f"🔁 {len(urls) - len(unique_urls)} URLs dupliquées ignorées")
+    urls = unique_urls
+
     logger.info(f"✅ {len(urls)} URLs chargées")
     return urls
 
 
+def _score_best(json_lds: List[Dict], url: str) -> Dict:
+    """
+    Score tous les blocs JSON-LD d'une page et retourne le meilleur
+
+    Fonction de niveau module (picklable) : la boucle entière s'exécute
+    dans le worker quand le pool de scoring est actif
+    """
+    best_score = 0
+    best_result = None
+
+    # Pré-passe : déduplication par empreinte canonique (bloc identique
+    # déjà vu sur cette page = inutile de le re-scorer), puis tri des
+    # blocs par taille sérialisée décroissante — les blocs les plus
+    # riches sont scorés d'abord pour maximiser les sorties anticipées
+    seen_digests = set()
+    candidates = []
+    for json_ld in json_lds:
+        try:
+            payload = _canonical_payload(json_ld)
+        except Exception as e:
+            logger.error(f"Erreur sérialisation JSON-LD pour {url}: {e}")
+            continue
+        digest = blake2b(payload, digest_size=16).digest()
+        if digest in seen_digests:
+            continue
+        seen_digests.add(digest)
+        candidates.append((len(payload), json_ld))
+
+    if len(candidates) > 1:
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+    for _, json_ld in candidates:
+        try:
+            score_result = score_json_ld(json_ld)
+
+            if score_result['score'] > best_score:
+                best_score = score_result['score']
+                best_result = score_result
+                best_result['json_ld'] = json_ld
+
+                # Bloc accepté avec un score déjà très élevé : scorer le
+                # reste de la page n'apporterait qu'un gain marginal,
+                # pas un changement d'issue accepté/rejeté
+                if best_score >= EARLY_ACCEPT_THRESHOLD and best_result.get('passed'):
+                    break
+
+        except Exception as e:
+            logger.error(f"Erreur scoring JSON-LD pour {url}: {e}")
+            continue
+
+    return best_result
+
+
 def process_single_url(url_data: Dict) -> Dict:
     """
     Traite une URL complète: scraping + validation + scoring
@@ -118,35 +291,29 @@ def process_single_url(url_data: Dict) -> Dict:
         result['rejection_reason'] = scrape_result['error_reason']
         return result
     
-    # 2. Traiter chaque JSON-LD trouvé (on garde le meilleur score)
+    # 2. Traiter chaque JSON-LD trouvé (on garde le meilleur score),
+    # déporté dans le pool de scoring s'il est actif : la page entière
+    # part en un seul aller-retour IPC, pas un par bloc
     json_lds = scrape_result['json_ld']
-    
-    best_score = 0
-    best_result = None
-    
-    for json_ld in json_lds:
-        try:
-            score_result = score_json_ld(json_ld)
-            
-            if score_result['score'] > best_score:
-                best_score = score_result['score']
-                best_result = score_result
-                best_result['json_ld'] = json_ld
-        
-        except Exception as e:
-            logger.error(f"Erreur scoring JSON-LD pour {url}: {e}")
-            continue
-    
+
+    if _scoring_executor is not None:
+        best_result = _scoring_executor.submit(_score_best, json_lds, url).result()
+    else:
+        best_result = _score_best(json_lds, url)
+
     if best_result is None:
         result['rejection_reason'] = 'scoring_failed'
         return result
     
-    # 3. Mise à jour du résultat avec le meilleur JSON-LD
+    # 3. Mise à jour du résultat avec le meilleur JSON-LD. Seuls les
+    # détails du bloc gagnant sont convertis en dicts sérialisables :
+    # les candidats écartés par _score_best restent des objets et
+    # n'allouent jamais leur forme JSON
     result.update({
         'passed': best_result['passed'],
         'score': best_result['score'],
         'breakdown': best_result['breakdown'],
-        'validation_details': best_result['validation_details'],
+        'validation_details': serializable_details(best_result['validation_details']),
         'json_ld': best_result['json_ld'],
         'schema_type': best_result['validation_details'].get('schema_type', 'Unknown')
     })
@@ -157,49 +324,52 @@ def process_single_url(url_data: Dict) -> Dict:
     return result
 
 
-def save_checkpoint(results: List[Dict], index: int):
-    """Sauvegarde un checkpoint intermédiaire"""
-    checkpoint_file = f"{OUTPUT_DIR}/checkpoint_{index}.json"
-    with open(checkpoint_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    logger.info(f"💾 Checkpoint sauvegardé: {checkpoint_file}")
+def save_checkpoint(results: List[Dict], processed_count: int, start_index: int = 0) -> int:
+    """
+    Ajoute les résultats depuis le dernier checkpoint au log append-only
 
+    Même mécanique que le checkpointing du Workflow 0 : seul le delta
+    depuis start_index est sérialisé, puis fsync pour que le checkpoint
+    survive à un crash. Le coût par checkpoint est O(delta), pas O(total).
 
-def save_results(results: List[Dict]):
+    Returns:
+        Index de reprise pour le prochain checkpoint
     """
-    Sauvegarde les résultats dans les fichiers de sortie
+    with open(CHECKPOINT_FILE, 'ab') as f:
+        for record in results[start_index:]:
+            f.write(_jsonl_line(record))
+        f.flush()
+        os.fsync(f.fileno())
+    logger.info(f"💾 Checkpoint sauvegardé: {processed_count} URLs, {CHECKPOINT_FILE}")
+    return len(results)
+
+
+def _result_summary(result: Dict) -> Dict:
     """
-    accepted = []
-    rejected = []
-    
-    for result in results:
-        if result.get('passed', False):
-            accepted.append(result)
-        else:
-            rejected.append(result)
-    
-    # Sauvegarder acceptés
-    logger.info(f"Sauvegarde de {len(accepted)} URLs acceptées...")
-    with open(ACCEPTED_FILE, 'w', encoding='utf-8') as f:
-        for item in accepted:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
-    
-    # Sauvegarder rejetés
-    logger.info(f"Sauvegarde de {len(rejected)} URLs rejetées...")
-    with open(REJECTED_FILE, 'w', encoding='utf-8') as f:
-        for item in rejected:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
-    
-    logger.info(f"✅ Résultats sauvegardés:")
-    logger.info(f"   - Acceptés: {ACCEPTED_FILE}")
-    logger.info(f"   - Rejetés: {REJECTED_FILE}")
+    Vue allégée d'un résultat pour les rapports et checkpoints
+
+    Les payloads json_ld peuvent peser des dizaines de Ko chacun : seuls
+    les champs consommés par le reporter sont conservés en mémoire, le
+    résultat complet est streamé vers les fichiers JSONL au fil de l'eau
+    """
+    summary = {k: result[k] for k in (
+        'url', 'passed', 'score', 'schema_type', 'rejection_reason',
+        'validation_details', 'scrape_status', 'http_status', 'timestamp'
+    ) if k in result}
+    return summary
 
 
 def main(input_file: str):
     """
     Point d'entrée principal
     """
+    global _scoring_executor
+
     setup_logging()
+
+    if SCORING_PROCESSES > 0:
+        _scoring_executor = ProcessPoolExecutor(max_workers=SCORING_PROCESSES)
+        logger.info(f"⚙️  Pool de scoring: {SCORING_PROCESSES} processus")
     
     logger.info("=" * 60)
     logger.info("🚀 JSON-LD VALIDATOR - WORKFLOW 1: LOCAL VALIDATION")
@@ -214,39 +384,96 @@ def main(input_file: str):
         
         logger.info(f"📊 Traitement de {total_urls} URLs...")
         
-        # 2. Traiter chaque URL
+        # 2. Traiter les URLs en parallèle : le travail est borné par la
+        # latence réseau, les workers recouvrent les attentes HTTP.
+        # Chaque résultat est streamé vers accepted/rejected dès qu'il
+        # arrive — seule une vue allégée reste en mémoire pour les
+        # rapports, pas les payloads json_ld complets
         results = []
-        
-        iterator = enumerate(url_data_list, 1)
-        if ENABLE_PROGRESS_BAR:
-            iterator = tqdm(iterator, total=total_urls, desc="Processing URLs")
-        
-        for i, url_data in iterator:
+        accepted_count = 0
+        rejected_count = 0
+
+        # Lignes en attente d'écriture : regroupées en un seul write()
+        # par lot pour réduire l'overhead d'appel Python par résultat
+        accepted_batch = []
+        rejected_batch = []
+
+        # Repartir d'un log de checkpoint vierge pour ce run
+        Path(CHECKPOINT_FILE).unlink(missing_ok=True)
+        checkpoint_index = 0
+
+        with open(ACCEPTED_FILE, 'wb', buffering=4 << 20) as accepted_f, \
+             open(REJECTED_FILE, 'wb', buffering=4 << 20) as rejected_f, \
+             ThreadPoolExecutor(max_workers=VALIDATION_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(process_single_url, url_data): url_data
+                for url_data in url_data_list
+            }
+
+            iterator = as_completed(futures)
             if ENABLE_PROGRESS_BAR:
-                iterator.set_description(f"Processing {url_data['url'][:50]}...")
-            
-            result = process_single_url(url_data)
-            results.append(result)
-            
-            # Checkpoint périodique
-            if i % CHECKPOINT_INTERVAL == 0:
-                save_checkpoint(results, i)
-        
-        # 3. Sauvegarder les résultats
+                # Pas de set_description par URL : chaque appel formate
+                # une chaîne et redessine le terminal sous verrou, ce qui
+                # domine le CPU quand les URLs s'enchaînent vite.
+                # mininterval espace aussi les redraws automatiques
+                iterator = tqdm(iterator, total=total_urls, desc="URLs",
+                                mininterval=0.5, smoothing=0.1)
+
+            i = 0
+            for future in iterator:
+                url_data = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Erreur traitement {url_data['url']}: {e}")
+                    result = {
+                        'url': url_data['url'],
+                        'passed': False,
+                        'rejection_reason': f'processing_error: {e}',
+                        'timestamp': datetime.utcnow().isoformat() + 'Z'
+                    }
+
+                # Écriture streamée du résultat complet (bytes UTF-8
+                # directs, pas d'aller-retour str → utf-8)
+                line = _jsonl_line(result)
+                if result.get('passed', False):
+                    accepted_batch.append(line)
+                    accepted_count += 1
+                    if len(accepted_batch) >= WRITE_BATCH_SIZE:
+                        accepted_f.write(b''.join(accepted_batch))
+                        accepted_batch.clear()
+                else:
+                    rejected_batch.append(line)
+                    rejected_count += 1
+                    if len(rejected_batch) >= WRITE_BATCH_SIZE:
+                        rejected_f.write(b''.join(rejected_batch))
+                        rejected_batch.clear()
+
+                results.append(_result_summary(result))
+
+                i += 1
+                # Checkpoint périodique (delta uniquement)
+                if i % CHECKPOINT_INTERVAL == 0:
+                    checkpoint_index = save_checkpoint(results, i, checkpoint_index)
+
+            # Vider les derniers lots incomplets
+            if accepted_batch:
+                accepted_f.write(b''.join(accepted_batch))
+            if rejected_batch:
+                rejected_f.write(b''.join(rejected_batch))
+
         logger.info("\n" + "=" * 60)
-        logger.info("💾 Sauvegarde des résultats...")
-        save_results(results)
-        
-        # 4. Générer les rapports
+        logger.info(f"✅ Résultats sauvegardés:")
+        logger.info(f"   - Acceptés: {ACCEPTED_FILE} ({accepted_count})")
+        logger.info(f"   - Rejetés: {REJECTED_FILE} ({rejected_count})")
+
+        # 3. Générer les rapports
         end_time = datetime.utcnow()
         logger.info("\n" + "=" * 60)
         logger.info("📊 Génération des rapports...")
         save_reports(results, total_urls, start_time, end_time, REPORT_FILE, DETAILED_REPORT_FILE)
         
-        # 5. Résumé final
-        accepted_count = len([r for r in results if r.get('passed', False)])
-        rejected_count = len([r for r in results if not r.get('passed', False)])
-        
+        # 4. Résumé final (compteurs tenus à jour pendant le streaming)
         logger.info("\n" + "=" * 60)
         logger.info("✅ TRAITEMENT TERMINÉ")
         logger.info("=" * 60)
@@ -269,6 +496,11 @@ def main(input_file: str):
         logger.error(f"❌ Erreur fatale: {e}", exc_info=True)
         return 1
 
+    finally:
+        if _scoring_executor is not None:
+            _scoring_executor.shutdown()
+            _scoring_executor = None
+
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
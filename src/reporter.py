@@ -2,53 +2,169 @@
 Module de génération de rapports
 """
 
+import heapq
 import json
 import logging
+import statistics
 from datetime import datetime
 from typing import Dict, List
-from collections import Counter, defaultdict
+from collections import Counter
+
+try:
+    import orjson  # Encode/décode 3-10x plus vite que le json stdlib
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # Réductions vectorisées sur les colonnes de stats
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
 
+def _aggregate(results: List[Dict]) -> Dict:
+    """
+    Calcule toutes les statistiques du rapport en une seule passe
+
+    Chaque métrique coûtait auparavant sa propre compréhension
+    `len([r for r in ...])` : ~15 traversées complètes de la liste et
+    autant de listes temporaires. Ici chaque résultat n'est visité
+    qu'une fois et ses dicts imbriqués ne sont déréférencés qu'une fois.
+
+    Les indicateurs booléens sont aplatis en colonnes (vue SoA) pendant
+    la passe puis réduits d'un coup — en C via NumPy quand il est
+    disponible, via sum() sinon. Les deux chemins donnent des comptes
+    identiques.
+    """
+    stats = {
+        'accepted': [],
+        'rejected': [],
+        'scores': [],
+        'score_sum': 0.0,
+        'score_ranges': {'90-100': 0, '80-89': 0},
+        'score_buckets': Counter(),
+        'schema_types': Counter(),
+        'rejection_reasons': Counter(),
+        'warnings': Counter(),
+        'missing_context': 0,
+        'missing_type': 0,
+    }
+
+    # Colonnes booléennes : syntax/structure sur tous les résultats,
+    # richesse sémantique sur les seuls acceptés
+    columns = {
+        'syntax_valid': [],
+        'structure_valid': [],
+        'has_id': [],
+        'has_same_as': [],
+        'has_quality_links': [],
+    }
+
+    for r in results:
+        validation_details = r.get('validation_details') or {}
+        structure = validation_details.get('structure') or {}
+
+        columns['syntax_valid'].append(
+            bool((validation_details.get('syntax') or {}).get('is_valid', False)))
+        columns['structure_valid'].append(bool(structure.get('is_valid', False)))
+
+        errors_str = str(structure.get('errors', []))
+        if '@context' in errors_str:
+            stats['missing_context'] += 1
+        if '@type' in errors_str:
+            stats['missing_type'] += 1
+
+        if r.get('passed', False):
+            stats['accepted'].append(r)
+
+            score = r.get('score', 0)
+            stats['scores'].append(score)
+            stats['score_sum'] += score
+            if score >= 90:
+                stats['score_ranges']['90-100'] += 1
+            elif score >= 80:
+                stats['score_ranges']['80-89'] += 1
+
+            stats['schema_types'][r.get('schema_type', 'unknown')] += 1
+
+            richness = validation_details.get('richness') or {}
+            columns['has_id'].append(bool(richness.get('has_id', False)))
+            columns['has_same_as'].append(bool(richness.get('has_same_as', False)))
+            columns['has_quality_links'].append(
+                bool(richness.get('has_quality_links', False)))
+        else:
+            stats['rejected'].append(r)
+            stats['rejection_reasons'][r.get('rejection_reason', 'unknown')] += 1
+            for warning in structure.get('warnings', []):
+                stats['warnings'][warning] += 1
+
+    # Histogramme des scores par tranches de 5 points : un seul passage
+    # vectorisé C quand NumPy est disponible, boucle Python sinon
+    scores = stats['scores']
+    if np is not None and scores:
+        arr = np.fromiter(scores, dtype=np.float32, count=len(scores))
+        buckets = (arr // 5).astype(np.int64) * 5
+        values, counts = np.unique(buckets, return_counts=True)
+        stats['score_buckets'].update(dict(zip(values.tolist(), counts.tolist())))
+    else:
+        for score in scores:
+            stats['score_buckets'][int(score // 5) * 5] += 1
+
+    # Réduction des colonnes en compteurs
+    for key, values in columns.items():
+        if np is not None:
+            stats[key] = int(np.count_nonzero(
+                np.fromiter(values, dtype=bool, count=len(values))))
+        else:
+            stats[key] = sum(values)
+
+    # Top 20 : sélection partielle O(N log 20), calculée une fois pour
+    # les deux rapports (le Markdown n'en affiche que les 10 premiers)
+    stats['top_urls'] = heapq.nlargest(
+        20,
+        (r for r in stats['accepted'] if 'url' in r),
+        key=lambda x: x.get('score', 0)
+    )
+
+    return stats
+
+
 def generate_markdown_report(
-    results: List[Dict],
+    stats: Dict,
     total_urls: int,
     start_time: datetime,
     end_time: datetime
 ) -> str:
     """
     Génère un rapport Markdown détaillé
+
+    Consomme les statistiques pré-agrégées par _aggregate (une seule
+    passe partagée avec le rapport JSON détaillé)
     """
     duration = end_time - start_time
-    
-    # Séparer acceptés et rejetés
-    accepted = [r for r in results if r.get('passed', False)]
-    rejected = [r for r in results if not r.get('passed', False)]
-    
-    # Statistiques par raison de rejet
-    rejection_reasons = Counter([r.get('rejection_reason', 'unknown') for r in rejected])
-    
-    # Statistiques par type de schema (acceptés)
-    schema_types = Counter([r.get('schema_type', 'unknown') for r in accepted])
-    
-    # Statistiques par plage de score
-    score_ranges = {
-        '90-100': len([r for r in accepted if r.get('score', 0) >= 90]),
-        '80-89': len([r for r in accepted if 80 <= r.get('score', 0) < 90]),
-    }
-    
-    # Top 10 des URLs avec le meilleur score
-    top_urls = sorted(
-        [r for r in accepted if 'url' in r],
-        key=lambda x: x.get('score', 0),
-        reverse=True
-    )[:10]
-    
-    # Génération du rapport
-    report = f"""# 📊 JSON-LD Dataset Extraction Report
 
-**Generated:** {end_time.strftime('%Y-%m-%d %H:%M:%S UTC')}  
+    accepted = stats['accepted']
+    rejected = stats['rejected']
+    n_accepted = len(accepted)
+    n_rejected = len(rejected)
+
+    rejection_reasons = stats['rejection_reasons']
+    schema_types = stats['schema_types']
+    score_ranges = stats['score_ranges']
+
+    avg_score = stats['score_sum'] / n_accepted if n_accepted else 0
+    # median_low évite le tri complet de la liste des scores
+    median_score = statistics.median_low(stats['scores']) if n_accepted else 0
+
+    # Top 10 : préfixe de la sélection partielle faite à l'agrégation
+    top_urls = stats['top_urls'][:10]
+
+    # Fragments accumulés puis un seul join final (évite la
+    # réallocation O(N²) des report += successifs)
+    parts = [f"""# 📊 JSON-LD Dataset Extraction Report
+
+**Generated:** {end_time.strftime('%Y-%m-%d %H:%M:%S UTC')}
 **Duration:** {duration.total_seconds() / 3600:.2f} hours ({duration.total_seconds() / 60:.1f} minutes)
 
 ---
@@ -58,12 +174,12 @@ def generate_markdown_report(
 | Metric | Value | Percentage |
 |--------|-------|------------|
 | **Total URLs Scanned** | {total_urls} | 100% |
-| **✅ Accepted** | {len(accepted)} | {len(accepted)/total_urls*100:.1f}% |
-| **❌ Rejected** | {len(rejected)} | {len(rejected)/total_urls*100:.1f}% |
+| **✅ Accepted** | {n_accepted} | {n_accepted/total_urls*100:.1f}% |
+| **❌ Rejected** | {n_rejected} | {n_rejected/total_urls*100:.1f}% |
 
 ### Quality Metrics
-- **Average Score (Accepted):** {sum(r.get('score', 0) for r in accepted) / len(accepted):.2f}/100 (if accepted else 0)
-- **Median Score (Accepted):** {sorted([r.get('score', 0) for r in accepted])[len(accepted)//2] if accepted else 0:.2f}/100
+- **Average Score (Accepted):** {avg_score:.2f}/100
+- **Median Score (Accepted):** {median_score:.2f}/100
 
 ---
 
@@ -72,19 +188,19 @@ def generate_markdown_report(
 ### By Score Range
 | Range | Count | Percentage |
 |-------|-------|------------|
-| 90-100 (Excellent) | {score_ranges['90-100']} | {score_ranges['90-100']/len(accepted)*100 if accepted else 0:.1f}% |
-| 80-89 (Good) | {score_ranges['80-89']} | {score_ranges['80-89']/len(accepted)*100 if accepted else 0:.1f}% |
+| 90-100 (Excellent) | {score_ranges['90-100']} | {score_ranges['90-100']/n_accepted*100 if n_accepted else 0:.1f}% |
+| 80-89 (Good) | {score_ranges['80-89']} | {score_ranges['80-89']/n_accepted*100 if n_accepted else 0:.1f}% |
 
 ### By Schema Type (Top 10)
 | Schema Type | Count | Percentage |
 |-------------|-------|------------|
-"""
-    
+"""]
+
     for schema_type, count in schema_types.most_common(10):
-        percentage = count / len(accepted) * 100 if accepted else 0
-        report += f"| {schema_type} | {count} | {percentage:.1f}% |\n"
+        percentage = count / n_accepted * 100 if n_accepted else 0
+        parts.append(f"| {schema_type} | {count} | {percentage:.1f}% |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## ❌ Rejection Breakdown
@@ -92,36 +208,29 @@ def generate_markdown_report(
 ### By Reason
 | Reason | Count | Percentage |
 |--------|-------|------------|
-"""
+""")
     
     for reason, count in rejection_reasons.most_common():
-        percentage = count / len(rejected) * 100 if rejected else 0
-        report += f"| {reason} | {count} | {percentage:.1f}% |\n"
-    
-    report += f"""
+        percentage = count / n_rejected * 100 if n_rejected else 0
+        parts.append(f"| {reason} | {count} | {percentage:.1f}% |\n")
+
+    parts.append(f"""
 ### Common Issues
-"""
-    
-    # Analyse des warnings communs
-    all_warnings = []
-    for r in rejected:
-        validation_details = r.get('validation_details', {})
-        structure = validation_details.get('structure', {})
-        all_warnings.extend(structure.get('warnings', []))
-    
-    warning_counter = Counter(all_warnings)
-    for warning, count in warning_counter.most_common(5):
-        percentage = count / len(rejected) * 100 if rejected else 0
-        report += f"- **{warning}:** {count} occurrences ({percentage:.1f}%)\n"
+""")
+
+    # Warnings déjà comptés pendant la passe d'agrégation
+    for warning, count in stats['warnings'].most_common(5):
+        percentage = count / n_rejected * 100 if n_rejected else 0
+        parts.append(f"- **{warning}:** {count} occurrences ({percentage:.1f}%)\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🏆 Top 10 Highest Scoring URLs
 
 | Rank | Score | Schema Type | URL |
 |------|-------|-------------|-----|
-"""
+""")
     
     for i, url_data in enumerate(top_urls, 1):
         score = url_data.get('score', 0)
@@ -129,15 +238,15 @@ def generate_markdown_report(
         url = url_data.get('url', 'N/A')
         # Tronquer l'URL si trop longue
         display_url = url[:60] + '...' if len(url) > 60 else url
-        report += f"| {i} | {score:.1f} | {schema_type} | {display_url} |\n"
+        parts.append(f"| {i} | {score:.1f} | {schema_type} | {display_url} |\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 📁 Output Files
 
-- ✅ **Accepted Dataset:** `output/accepted_local.jsonl` ({len(accepted)} entries)
-- ❌ **Rejected URLs:** `output/rejected_local.jsonl` ({len(rejected)} entries)
+- ✅ **Accepted Dataset:** `output/accepted_local.jsonl` ({n_accepted} entries)
+- ❌ **Rejected URLs:** `output/rejected_local.jsonl` ({n_rejected} entries)
 - 📊 **Detailed Report:** `output/detailed_report.json` (full metrics)
 - 📝 **This Report:** `output/validation_report.md`
 
@@ -146,58 +255,53 @@ def generate_markdown_report(
 ## 📊 Score Distribution
 
 ### Accepted URLs Score Distribution
-"""
+""")
     
-    # Histogramme des scores
-    score_buckets = defaultdict(int)
-    for r in accepted:
-        score = r.get('score', 0)
-        bucket = int(score // 5) * 5  # Buckets de 5 points
-        score_buckets[bucket] += 1
+    # Histogramme des scores (buckets remplis pendant l'agrégation)
+    score_buckets = stats['score_buckets']
+    if score_buckets:
+        max_bucket_count = max(score_buckets.values())
+        for bucket in sorted(score_buckets.keys(), reverse=True):
+            count = score_buckets[bucket]
+            bar = '█' * int(count / max_bucket_count * 50)
+            parts.append(f"| {bucket}-{bucket+4} | {bar} {count}\n")
     
-    for bucket in sorted(score_buckets.keys(), reverse=True):
-        count = score_buckets[bucket]
-        bar = '█' * int(count / max(score_buckets.values()) * 50)
-        report += f"| {bucket}-{bucket+4} | {bar} {count}\n"
-    
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 🔍 Validation Statistics
 
 ### Syntax Validation
-- **Valid JSON-LD:** {len([r for r in results if r.get('validation_details', {}).get('syntax', {}).get('is_valid', False)])}
-- **Invalid JSON-LD:** {len([r for r in results if not r.get('validation_details', {}).get('syntax', {}).get('is_valid', False)])}
+- **Valid JSON-LD:** {stats['syntax_valid']}
+- **Invalid JSON-LD:** {n_accepted + n_rejected - stats['syntax_valid']}
 
 ### Structure Validation
-- **Valid Structure:** {len([r for r in results if r.get('validation_details', {}).get('structure', {}).get('is_valid', False)])}
-- **Missing @context:** {len([r for r in results if '@context' in str(r.get('validation_details', {}).get('structure', {}).get('errors', []))])}
-- **Missing @type:** {len([r for r in results if '@type' in str(r.get('validation_details', {}).get('structure', {}).get('errors', []))])}
+- **Valid Structure:** {stats['structure_valid']}
+- **Missing @context:** {stats['missing_context']}
+- **Missing @type:** {stats['missing_type']}
 
 ### Semantic Richness (Accepted URLs)
-- **With @id:** {len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_id', False)])} ({len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_id', False)]) / len(accepted) * 100 if accepted else 0:.1f}%)
-- **With sameAs:** {len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_same_as', False)])} ({len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_same_as', False)]) / len(accepted) * 100 if accepted else 0:.1f}%)
-- **With Quality Links:** {len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_quality_links', False)])} ({len([r for r in accepted if r.get('validation_details', {}).get('richness', {}).get('has_quality_links', False)]) / len(accepted) * 100 if accepted else 0:.1f}%)
+- **With @id:** {stats['has_id']} ({stats['has_id'] / n_accepted * 100 if n_accepted else 0:.1f}%)
+- **With sameAs:** {stats['has_same_as']} ({stats['has_same_as'] / n_accepted * 100 if n_accepted else 0:.1f}%)
+- **With Quality Links:** {stats['has_quality_links']} ({stats['has_quality_links'] / n_accepted * 100 if n_accepted else 0:.1f}%)
 
 ---
 
 ## 💡 Recommendations
 
-"""
+""")
     
     # Recommandations basées sur les résultats
-    if len(rejected) / total_urls > 0.5:
-        report += "⚠️ **High rejection rate:** Consider adjusting the minimum score threshold or improving URL sources.\n\n"
-    
+    if n_rejected / total_urls > 0.5:
+        parts.append("⚠️ **High rejection rate:** Consider adjusting the minimum score threshold or improving URL sources.\n\n")
+
     if rejection_reasons.get('no_jsonld_found', 0) > total_urls * 0.2:
-        report += "⚠️ **Many URLs without JSON-LD:** Consider filtering URLs before scraping to ensure they have structured data.\n\n"
-    
-    if len(accepted) > 0:
-        avg_score = sum(r.get('score', 0) for r in accepted) / len(accepted)
-        if avg_score < 85:
-            report += "💡 **Average score could be improved:** Focus on URLs with more complete Schema.org implementations.\n\n"
+        parts.append("⚠️ **Many URLs without JSON-LD:** Consider filtering URLs before scraping to ensure they have structured data.\n\n")
+
+    if n_accepted > 0 and avg_score < 85:
+        parts.append("💡 **Average score could be improved:** Focus on URLs with more complete Schema.org implementations.\n\n")
     
-    report += f"""
+    parts.append(f"""
 ---
 
 ## 📈 Next Steps
@@ -210,25 +314,31 @@ def generate_markdown_report(
 ---
 
 *Report generated by JSON-LD Validator v1.0*
-"""
+""")
     
-    return report
+    return ''.join(parts)
 
 
 def generate_detailed_json_report(
-    results: List[Dict],
+    stats: Dict,
     total_urls: int,
     start_time: datetime,
     end_time: datetime
 ) -> Dict:
     """
     Génère un rapport JSON détaillé avec toutes les métriques
+
+    Toutes les valeurs viennent des statistiques pré-agrégées : la
+    partition acceptés/rejetés et les Counters ne sont plus recalculés
+    indépendamment du rapport Markdown
     """
     duration = (end_time - start_time).total_seconds()
-    
-    accepted = [r for r in results if r.get('passed', False)]
-    rejected = [r for r in results if not r.get('passed', False)]
-    
+
+    accepted = stats['accepted']
+    scores = stats['scores']
+    n_accepted = len(accepted)
+    n_rejected = len(stats['rejected'])
+
     return {
         'metadata': {
             'generated_at': end_time.isoformat() + 'Z',
@@ -239,26 +349,26 @@ def generate_detailed_json_report(
         },
         'summary': {
             'total_urls': total_urls,
-            'accepted_count': len(accepted),
-            'rejected_count': len(rejected),
-            'acceptance_rate': len(accepted) / total_urls if total_urls > 0 else 0,
-            'rejection_rate': len(rejected) / total_urls if total_urls > 0 else 0
+            'accepted_count': n_accepted,
+            'rejected_count': n_rejected,
+            'acceptance_rate': n_accepted / total_urls if total_urls > 0 else 0,
+            'rejection_rate': n_rejected / total_urls if total_urls > 0 else 0
         },
         'scores': {
-            'average': sum(r.get('score', 0) for r in accepted) / len(accepted) if accepted else 0,
-            'median': sorted([r.get('score', 0) for r in accepted])[len(accepted)//2] if accepted else 0,
-            'min': min([r.get('score', 0) for r in accepted]) if accepted else 0,
-            'max': max([r.get('score', 0) for r in accepted]) if accepted else 0,
+            'average': stats['score_sum'] / n_accepted if n_accepted else 0,
+            'median': statistics.median_low(scores) if scores else 0,
+            'min': min(scores) if scores else 0,
+            'max': max(scores) if scores else 0,
         },
-        'schema_types': dict(Counter([r.get('schema_type', 'unknown') for r in accepted])),
-        'rejection_reasons': dict(Counter([r.get('rejection_reason', 'unknown') for r in rejected])),
+        'schema_types': dict(stats['schema_types']),
+        'rejection_reasons': dict(stats['rejection_reasons']),
         'top_urls': [
             {
                 'url': r.get('url'),
                 'score': r.get('score'),
                 'schema_type': r.get('schema_type')
             }
-            for r in sorted(accepted, key=lambda x: x.get('score', 0), reverse=True)[:20]
+            for r in stats['top_urls']
         ]
     }
 
@@ -273,21 +383,30 @@ def save_reports(
 ):
     """
     Sauvegarde les rapports Markdown et JSON
+
+    L'agrégation des résultats n'est faite qu'une fois ici, puis
+    partagée entre les deux générateurs
     """
+    stats = _aggregate(results)
+
     # Génération Markdown
     logger.info("Génération du rapport Markdown...")
-    markdown_report = generate_markdown_report(results, total_urls, start_time, end_time)
-    
+    markdown_report = generate_markdown_report(stats, total_urls, start_time, end_time)
+
     with open(markdown_path, 'w', encoding='utf-8') as f:
         f.write(markdown_report)
-    
+
     logger.info(f"✅ Rapport Markdown sauvegardé: {markdown_path}")
-    
+
     # Génération JSON
     logger.info("Génération du rapport JSON détaillé...")
-    json_report = generate_detailed_json_report(results, total_urls, start_time, end_time)
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(json_report, f, indent=2, ensure_ascii=False)
+    json_report = generate_detailed_json_report(stats, total_urls, start_time, end_time)
+
+    if orjson is not None:
+        payload = orjson.dumps(json_report, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(json_report, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(json_path, 'wb') as f:
+        f.write(payload)
     
     logger.info(f"✅ Rapport JSON sauvegardé: {json_path}")
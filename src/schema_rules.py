@@ -3,6 +3,14 @@ Règles de validation Schema.org par type
 Basé sur la documentation Google et Schema.org officielle
 """
 
+from functools import lru_cache
+
+from .config import AI_PRIORITY_TYPES
+
+# Frozenset figé à l'import : un test d'appartenance O(1) par item
+# scoré, sans ré-import de la config à chaque appel
+_AI_PRIORITY_SET = frozenset(AI_PRIORITY_TYPES)
+
 # Structure: {
 #   "SchemaType": {
 #       "required": [...],          # Propriétés requises par Google
@@ -322,31 +330,92 @@ SCHEMA_RULES = {
 }
 
 
+def _compile_rules(rules):
+    """
+    Compile les règles déclaratives en structures figées
+
+    Les listes required/recommended deviennent des frozensets (tests
+    d'appartenance O(1) au lieu de scans O(n), pas de sets temporaires
+    reconstruits à chaque JSON-LD validé) et parent_types un tuple.
+    Les checkers spécialisés par type sont dérivés de ces structures
+    dans compiled_rules. Exécuté une seule fois à l'import du module
+    """
+    return {
+        schema_type: {
+            'required': frozenset(rule.get('required', ())),
+            'recommended': frozenset(rule.get('recommended', ())),
+            'expected_types': {
+                prop: frozenset(types)
+                for prop, types in rule.get('expected_types', {}).items()
+            },
+            'parent_types': tuple(rule.get('parent_types', ())),
+            '_parent_set': frozenset(rule.get('parent_types', ())),
+        }
+        for schema_type, rule in rules.items()
+    }
+
+
+SCHEMA_RULES = _compile_rules(SCHEMA_RULES)
+
+
+def _specificity_from_parent_count(parent_count):
+    """Barème de spécificité : plus de parents = type plus spécifique"""
+    if parent_count >= 3:
+        return 10
+    elif parent_count == 2:
+        return 7
+    elif parent_count == 1:
+        return 4
+    else:
+        return 1
+
+
+# Table de spécificité par type, figée à l'import : un lookup O(1) par
+# item scoré au lieu de re-mesurer la hiérarchie parent_types
+SCHEMA_DEPTH = {
+    schema_type: _specificity_from_parent_count(len(rule['parent_types']))
+    for schema_type, rule in SCHEMA_RULES.items()
+}
+
+
+# Types dont l'héritage justifie le fallback sur CreativeWork
+_CREATIVE_WORK_FALLBACK_TYPES = frozenset({
+    "Article", "BlogPosting", "NewsArticle", "Recipe",
+    "HowTo", "Question", "Answer", "VideoObject", "Book"
+})
+
+
+@lru_cache(maxsize=None)
 def get_schema_rules(schema_type):
     """
     Récupère les règles pour un type donné, avec fallback sur les parents
+
+    Mémoïsé : les règles compilées sont immuables et il n'existe qu'une
+    poignée de types distincts par run — après le premier appel, chaque
+    type ne coûte plus qu'un lookup dans le cache
     """
     if schema_type in SCHEMA_RULES:
         return SCHEMA_RULES[schema_type]
-    
+
     # Fallback sur CreativeWork si le type hérite de CreativeWork
-    creative_work_types = [
-        "Article", "BlogPosting", "NewsArticle", "Recipe", 
-        "HowTo", "Question", "Answer", "VideoObject", "Book"
-    ]
-    if any(parent in creative_work_types for parent in SCHEMA_RULES.get(schema_type, {}).get("parent_types", [])):
+    # (intersection C-level de deux frozensets précompilés)
+    parents = SCHEMA_RULES.get(schema_type, {}).get("_parent_set", frozenset())
+    if _CREATIVE_WORK_FALLBACK_TYPES & parents:
         return SCHEMA_RULES["CreativeWork"]
-    
+
     # Fallback sur Thing
     return SCHEMA_RULES["Thing"]
 
 
+# Figé à l'import : l'énumération des types ne reconstruit pas de liste
+_ALL_SCHEMA_TYPES = tuple(SCHEMA_RULES)
+
+
 def get_all_schema_types():
     """Retourne tous les types supportés"""
-    return list(SCHEMA_RULES.keys())
+    return list(_ALL_SCHEMA_TYPES)
 
 
 def is_ai_priority_type(schema_type):
     """Vérifie si le type est prioritaire pour les IA"""
-    from .config import AI_PRIORITY_TYPES
-    return schema_type in AI_PRIORITY_TYPES
+    return schema_type in _AI_PRIORITY_SET
@@ -2,9 +2,17 @@
 Module de scoring pour évaluer la qualité des JSON-LD
 """
 
+import json
 import logging
-from typing import Dict
-from .config import WEIGHTS, AI_PRIORITY_TYPES_BONUS
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+try:
+    import orjson  # Encode/décode 3-10x plus vite que le json stdlib
+except ImportError:
+    orjson = None
+
+from .config import WEIGHTS, AI_PRIORITY_TYPES_BONUS, MIN_SCORE_THRESHOLD
 from .schema_rules import is_ai_priority_type
 
 logger = logging.getLogger(__name__)
@@ -15,18 +23,17 @@ def calculate_syntax_score(validation_details: Dict) -> float:
     Score de validation syntaxique (0-15 points)
     Pass/Fail critique
     """
-    syntax = validation_details.get('syntax', {})
-    
-    if not syntax.get('is_valid', False):
+    syntax = validation_details.get('syntax')
+
+    if syntax is None or not syntax.is_valid:
         return 0.0
-    
+
     # JSON valide = 15 points
     score = 15.0
-    
+
     # Pénalité pour warnings
-    warnings = syntax.get('warnings', [])
-    score -= len(warnings) * 2
-    
+    score -= len(syntax.warnings) * 2
+
     return max(0, score)
 
 
@@ -35,22 +42,22 @@ def calculate_completeness_score(validation_details: Dict) -> float:
     Score de complétude (0-30 points)
     Basé sur le % de propriétés remplies (requises + recommandées)
     """
-    structure = validation_details.get('structure', {})
-    properties = validation_details.get('properties', {})
-    
-    if not structure.get('is_valid', False):
+    structure = validation_details.get('structure')
+    properties = validation_details.get('properties')
+
+    if structure is None or not structure.is_valid:
         return 0.0
-    
-    info = properties.get('info', {})
-    
+
+    info = properties.info if properties is not None else {}
+
     # Calculer le total de propriétés applicables
     required_count = info.get('required_count', 0)
     recommended_count = info.get('recommended_count', 0)
     total_applicable = required_count + recommended_count
-    
+
     if total_applicable == 0:
         # Pas de règles spécifiques, utiliser le nombre de propriétés
-        property_count = structure.get('info', {}).get('property_count', 0)
+        property_count = structure.info.get('property_count', 0)
         # Score basé sur le nombre absolu
         score = min(property_count * 3, 30)
         return score
@@ -73,13 +80,13 @@ def calculate_google_conformity_score(validation_details: Dict) -> float:
     Score de conformité Google (0-25 points)
     Basé sur les propriétés requises par Google
     """
-    properties = validation_details.get('properties', {})
-    
-    if not properties.get('is_valid', False):
+    properties = validation_details.get('properties')
+
+    if properties is None or not properties.is_valid:
         return 0.0
-    
-    info = properties.get('info', {})
-    
+
+    info = properties.info
+
     required_count = info.get('required_count', 0)
     required_present = info.get('required_present', 0)
     
@@ -151,10 +158,114 @@ def calculate_ai_priority_bonus(validation_details: Dict) -> float:
     return 0.0
 
 
+class Breakdown(NamedTuple):
+    """
+    Composantes du score, en layout tuple figé
+
+    Une allocation C-level par item scoré au lieu d'un dict à six clés
+    chaînes ; le total est simplement sum(breakdown). Conversion en
+    dict uniquement à la frontière de l'API, via _asdict()
+    """
+    syntax: float
+    completeness: float
+    google_conformity: float
+    semantic_richness: float
+    type_specificity: float
+    ai_priority_bonus: float
+
+
+def _emit_scorer_src(schema_type: str) -> str:
+    """
+    Génère le source Python d'un scorer spécialisé pour un type donné
+
+    Les composantes du score sont déroulées en ligne droite (pas d'appels
+    aux helpers calculate_*) et les parties qui ne dépendent que du type
+    — le bonus IA — sont précalculées et injectées comme littéraux.
+    Les entrées syntax/structure/properties sont lues en accès attribut
+    (ValidationResult à __slots__), aucun dict intermédiaire n'est créé.
+    Les documents invalides sortent immédiatement : sur un details
+    produit par validate_full, syntaxe ou structure invalide implique
+    que les composantes suivantes sont vides.
+    Les helpers ci-dessus restent l'implémentation de référence
+    """
+    ai_bonus = float(AI_PRIORITY_TYPES_BONUS) if is_ai_priority_type(schema_type) else 0.0
+
+    return f'''\
+def score(details):
+    syntax_d = details['syntax']
+    if syntax_d is None or not syntax_d.is_valid:
+        # Syntaxe invalide : validate_full n'a rien rempli d'autre,
+        # inutile de dérouler les cinq composantes restantes
+        return Breakdown(0.0, 0.0, 0.0, 0.0, 0.0, {ai_bonus!r})
+
+    syntax = 15.0 - 2 * len(syntax_d.warnings)
+    if syntax < 0.0:
+        syntax = 0.0
+
+    structure = details['structure']
+    if structure is None or not structure.is_valid:
+        # Structure invalide : properties/richness/specificity sont vides
+        return Breakdown(syntax, 0.0, 0.0, 0.0, 0.0, {ai_bonus!r})
+
+    properties = details['properties']
+    info = properties.info
+
+    total_applicable = info.get('required_count', 0) + info.get('recommended_count', 0)
+    if total_applicable == 0:
+        prop_count = structure.info.get('property_count', 0)
+        completeness = min(prop_count * 3, 30)
+    else:
+        completeness = (info.get('required_present', 0)
+                        + info.get('recommended_present', 0)) / total_applicable * 30
+
+    if not properties.is_valid:
+        conformity = 0.0
+    else:
+        required_count = info.get('required_count', 0)
+        if required_count == 0:
+            conformity = 15.0
+        else:
+            ratio = info.get('required_present', 0) / required_count
+            conformity = 25.0 if ratio == 1.0 else ratio * 25
+
+    richness_d = details.get('richness', {{}})
+    richness = 0.0
+    if richness_d.get('has_id', False):
+        richness += 5
+    if richness_d.get('has_same_as', False):
+        richness += 5
+        if richness_d.get('has_quality_links', False):
+            richness += 5
+    nested_count = richness_d.get('nested_entities_count', 0)
+    if nested_count > 1:
+        richness += min(nested_count - 1, 5)
+    if richness > 20:
+        richness = 20.0
+
+    specificity = float(details.get('specificity_score', 0))
+
+    return Breakdown(syntax, completeness, conformity, richness, specificity, {ai_bonus!r})
+'''
+
+
+@lru_cache(maxsize=None)
+def _compiled_scorer(schema_type: str):
+    """
+    Compile (une fois par type) le scorer spécialisé pour ce type
+
+    Le coût de compilation est amorti dès le deuxième JSON-LD du même
+    type : les pages d'un même site partagent presque toujours une
+    poignée de types (Product, Article, FAQPage...)
+    """
+    namespace = {'Breakdown': Breakdown}
+    exec(compile(_emit_scorer_src(schema_type), f'<scorer:{schema_type}>', 'exec'), namespace)
+    return namespace['score']
+
+
 def calculate_final_score(validation_details: Dict) -> Dict:
     """
     Calcule le score final avec détails des composantes
-    
+
     Returns:
         {
             'total_score': float (0-100+),
@@ -169,42 +280,36 @@ def calculate_final_score(validation_details: Dict) -> Dict:
             'passed': bool (score >= threshold)
         }
     """
-    breakdown = {
-        'syntax': calculate_syntax_score(validation_details),
-        'completeness': calculate_completeness_score(validation_details),
-        'google_conformity': calculate_google_conformity_score(validation_details),
-        'semantic_richness': calculate_semantic_richness_score(validation_details),
-        'type_specificity': calculate_type_specificity_score(validation_details),
-        'ai_priority_bonus': calculate_ai_priority_bonus(validation_details)
-    }
-    
-    total_score = sum(breakdown.values())
-    
-    # Vérifier le seuil d'acceptation
-    from .config import MIN_SCORE_THRESHOLD
-    passed = total_score >= MIN_SCORE_THRESHOLD
-    
+    schema_type = validation_details.get('schema_type')
+    scorer = _compiled_scorer(schema_type if isinstance(schema_type, str) else 'Thing')
+
+    # Le scorer compilé renvoie un Breakdown (tuple figé) : le total est
+    # la somme des composantes et le dict n'est construit (et arrondi)
+    # qu'une seule fois, à la frontière de l'API
+    breakdown = scorer(validation_details)
+    total_score = sum(breakdown)
+
     return {
         'total_score': round(total_score, 2),
-        'breakdown': {k: round(v, 2) for k, v in breakdown.items()},
-        'passed': passed
+        'breakdown': {
+            field: round(value, 2)
+            for field, value in zip(Breakdown._fields, breakdown)
+        },
+        'passed': total_score >= MIN_SCORE_THRESHOLD
     }
 
 
-def score_json_ld(json_ld: Dict) -> Dict:
-    """
-    Score complet d'un JSON-LD
-    
-    Returns:
-        {
-            'score': float,
-            'breakdown': dict,
-            'passed': bool,
-            'validation_details': dict
-        }
-    """
+def _canonical_bytes(json_ld) -> bytes:
+    """Forme canonique (clés triées) d'un JSON-LD, clé de cache stable"""
+    if orjson is not None:
+        return orjson.dumps(json_ld, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(json_ld, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _score_uncached(json_ld) -> Dict:
+    """Validation + scoring complets, sans passage par le cache"""
     from .validator import validate_full
-    
+
     # Validation complète
     is_valid, validation_details = validate_full(json_ld)
     
@@ -229,5 +334,67 @@ def score_json_ld(json_ld: Dict) -> Dict:
     
     if not score_result['passed']:
         result['rejection_reason'] = f"score_too_low ({score_result['total_score']}/{MIN_SCORE_THRESHOLD})"
-    
+
     return result
+
+
+@lru_cache(maxsize=1024)
+def _score_by_canonical(canonical: bytes) -> Dict:
+    """Score mémoïsé par forme canonique (re-parse le JSON-LD depuis la clé)"""
+    if orjson is not None:
+        return _score_uncached(orjson.loads(canonical))
+    return _score_uncached(json.loads(canonical))
+
+
+def score_json_ld(json_ld: Dict) -> Dict:
+    """
+    Score complet d'un JSON-LD
+
+    Les blocs identiques reviennent constamment d'une page à l'autre
+    (Organization, BreadcrumbList... répétés sur tout un site) : le
+    résultat est mémoïsé par forme canonique, une occurrence répétée ne
+    coûte qu'une sérialisation et un lookup.
+
+    Returns:
+        {
+            'score': float,
+            'breakdown': dict,
+            'passed': bool,
+            'validation_details': dict
+        }
+    """
+    try:
+        canonical = _canonical_bytes(json_ld)
+    except (TypeError, ValueError):
+        # Non sérialisable (types exotiques) : scoring direct sans cache
+        return _score_uncached(json_ld)
+
+    # Copie superficielle : les appelants annotent le résultat (json_ld,
+    # métadonnées d'URL) et tournent dans plusieurs threads — l'objet en
+    # cache ne doit jamais être muté
+    return dict(_score_by_canonical(canonical))
+
+
+def score_batch(docs: List[Dict], max_workers: int = None) -> List[Dict]:
+    """
+    Score un lot de documents en parallèle sur plusieurs processus
+
+    Pendant symétrique de validator.validate_batch : le scoring
+    (validation incluse) est du pur CPU, donc un ProcessPoolExecutor
+    avec chunksize pour amortir le pickling. Les tables de règles et
+    les kernels compilés sont reconstruits une fois par worker au fork ;
+    le cache par forme canonique reste par processus mais les doublons
+    d'un même chunk en profitent. Les petits lots restent en séquentiel
+    et partagent le cache du processus appelant.
+
+    Returns:
+        [résultat de score_json_ld, ...] dans l'ordre des docs
+    """
+    if len(docs) <= 64:
+        return [score_json_ld(doc) for doc in docs]
+
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        return list(pool.map(score_json_ld, docs, chunksize=64))
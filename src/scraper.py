@@ -4,43 +4,180 @@ Module de scraping pour extraire les JSON-LD depuis les URLs
 
 import requests
 import json
+import re
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, urljoin
-from urllib.robotparser import RobotFileParser
-from bs4 import BeautifulSoup
+import lxml.html
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+try:
+    import orjson  # Décode 3-10x plus vite que le json stdlib
+except ImportError:
+    orjson = None
+
 from .config import (
     REQUEST_TIMEOUT, RATE_LIMIT_DELAY, MAX_RETRIES,
-    REQUEST_HEADERS, RESPECT_ROBOTS_TXT, ROBOTS_CACHE_DURATION
+    REQUEST_HEADERS, RESPECT_ROBOTS_TXT, ROBOTS_CACHE_DURATION,
+    VALIDATION_MAX_WORKERS, MAX_HTML_BYTES
 )
 
 logger = logging.getLogger(__name__)
 
+# Décodeur résolu une fois à l'import, pas un if par bloc JSON-LD
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Chemin rapide d'extraction : sur une page bien formée, le contenu des
+# scripts ld+json se capture à la regex sans construire d'arbre HTML
+_JSONLD_RE = re.compile(
+    r'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Session partagée : les connexions TCP+TLS sont réutilisées entre
+# requêtes (keep-alive) au lieu d'une poignée de main par URL. Les
+# pools sont dimensionnés pour les workers concurrents du Workflow 1
+_SESSION = requests.Session()
+_SESSION.headers.update(REQUEST_HEADERS)
+# max_retries=0 : la politique de retry (avec backoff) reste celle de
+# fetch_html, pas celle d'urllib3
+_adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+
+
+class _RobotsRules:
+    """
+    Règles robots.txt compilées pour notre User-Agent
+
+    Les préfixes Disallow du bloc applicable sont fusionnés en une seule
+    regex ancrée : can_fetch est un unique match C au lieu d'un parcours
+    Python des règles à chaque URL. disallow_re à None = tout autorisé
+    """
+    __slots__ = ('disallow_re', 'crawl_delay')
+
+    def __init__(self, disallow_re, crawl_delay: Optional[float] = None):
+        self.disallow_re = disallow_re
+        self.crawl_delay = crawl_delay
+
+    def can_fetch(self, path: str) -> bool:
+        if self.disallow_re is None:
+            return True
+        return self.disallow_re.match(path) is None
+
+
+# Regex qui matche tout chemin : équivalent compilé de disallow_all
+_MATCH_ALL_RE = re.compile('')
+
+
+def _compile_robots(text: str, user_agent: str) -> _RobotsRules:
+    """
+    Compile un robots.txt en _RobotsRules
+
+    Seuls User-agent, Disallow et Crawl-delay sont interprétés (les
+    préfixes sont matchés littéralement, comme urllib.robotparser) ;
+    le bloc spécifique à notre UA prime sur le bloc `*`
+    """
+    ua_token = user_agent.split('/')[0].lower()
+
+    # Regrouper les lignes par bloc User-agent
+    groups = []
+    agents, disallows, delay, seen_rule = [], [], None, False
+    for raw_line in text.splitlines():
+        line = raw_line.split('#', 1)[0].strip()
+        if not line or ':' not in line:
+            continue
+        key, _, value = line.partition(':')
+        key = key.strip().lower()
+        value = value.strip()
+
+        if key == 'user-agent':
+            if seen_rule:
+                groups.append((agents, disallows, delay))
+                agents, disallows, delay, seen_rule = [], [], None, False
+            agents.append(value.lower())
+        elif key == 'disallow':
+            seen_rule = True
+            if value:
+                disallows.append(value)
+        elif key == 'crawl-delay':
+            seen_rule = True
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+        else:
+            seen_rule = True
+    if agents:
+        groups.append((agents, disallows, delay))
+
+    # Bloc applicable : UA spécifique d'abord, sinon `*`
+    chosen = None
+    for group_agents, group_disallows, group_delay in groups:
+        if any(agent != '*' and agent in ua_token for agent in group_agents):
+            chosen = (group_disallows, group_delay)
+            break
+    if chosen is None:
+        for group_agents, group_disallows, group_delay in groups:
+            if '*' in group_agents:
+                chosen = (group_disallows, group_delay)
+                break
+    if chosen is None:
+        return _RobotsRules(None)
+
+    disallows, delay = chosen
+    if not disallows:
+        return _RobotsRules(None, delay)
+
+    disallow_re = re.compile('^(?:' + '|'.join(re.escape(p) for p in disallows) + ')')
+    return _RobotsRules(disallow_re, delay)
+
 
 class RobotsCache:
-    """Cache pour les fichiers robots.txt"""
+    """
+    Cache TTL pour les fichiers robots.txt
+
+    Une seule entrée (règles compilées, expiration) par hôte dans un
+    dict sous verrou : le chemin chaud coûte un lookup, pas deux (cache
+    + timestamps). Le fichier est téléchargé via la session partagée —
+    même pool de connexions que fetch_html — au lieu du rp.read() qui
+    ouvre sa propre connexion urllib. Les échecs sont aussi mis en
+    cache pour ne pas re-tenter le fetch à chaque URL du même hôte
+    """
+    __slots__ = ('_lock', '_cache')
+
     def __init__(self):
-        self.cache = {}
-        self.timestamps = {}
-    
-    def get_parser(self, base_url: str) -> Optional[RobotFileParser]:
-        """Récupère ou crée un parser robots.txt"""
-        if base_url in self.cache:
-            # Vérifier si le cache est encore valide
-            if time.time() - self.timestamps[base_url] < ROBOTS_CACHE_DURATION:
-                return self.cache[base_url]
-        
-        # Créer un nouveau parser
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get_rules(self, base_url: str) -> Optional[_RobotsRules]:
+        """Récupère ou compile les règles robots.txt d'un hôte"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(base_url)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        rules = self._fetch(base_url)
+
+        with self._lock:
+            self._cache[base_url] = (rules, time.monotonic() + ROBOTS_CACHE_DURATION)
+        return rules
+
+    @staticmethod
+    def _fetch(base_url: str) -> Optional[_RobotsRules]:
+        """Télécharge et compile robots.txt (mêmes statuts que RobotFileParser.read)"""
+        robots_url = urljoin(base_url, '/robots.txt')
         try:
-            rp = RobotFileParser()
-            rp.set_url(urljoin(base_url, '/robots.txt'))
-            rp.read()
-            self.cache[base_url] = rp
-            self.timestamps[base_url] = time.time()
-            return rp
+            response = _SESSION.get(robots_url, timeout=REQUEST_TIMEOUT)
+            if response.status_code in (401, 403):
+                return _RobotsRules(_MATCH_ALL_RE)
+            if response.status_code >= 400:
+                return _RobotsRules(None)
+            return _compile_robots(response.text, REQUEST_HEADERS['User-Agent'])
         except Exception as e:
             logger.warning(f"Impossible de lire robots.txt pour {base_url}: {e}")
             return None
@@ -50,6 +187,52 @@ class RobotsCache:
 robots_cache = RobotsCache()
 
 
+class _HostRateLimiter:
+    """
+    Rate limit appliqué par hôte, pas globalement
+
+    Le délai de politesse ne concerne que les requêtes successives vers
+    un même hôte : des fetches vers des hôtes différents peuvent se
+    recouvrir librement, ce qui laisse les workers parallèles saturer
+    le réseau sans marteler aucun serveur individuel
+    """
+    __slots__ = ('delay', '_lock', '_next_at')
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_at = {}
+
+    def wait(self, host: str):
+        """Bloque jusqu'au prochain créneau autorisé pour cet hôte"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                next_at = self._next_at.get(host, 0.0)
+                if now >= next_at:
+                    self._next_at[host] = now + self.delay
+                    return
+                pause = next_at - now
+            time.sleep(pause)
+
+
+_rate_limiter = _HostRateLimiter(RATE_LIMIT_DELAY)
+
+# Timestamp ISO mis en cache à la seconde : le formatage datetime coûte
+# des centaines de ns par appel et la précision sous-seconde n'apporte
+# rien aux horodatages de scraping
+_TS_CACHE = [0, '']
+
+
+def _now_iso() -> str:
+    """Timestamp ISO-8601 UTC (précision seconde, formaté 1x par seconde)"""
+    t = int(time.time())
+    if t != _TS_CACHE[0]:
+        _TS_CACHE[0] = t
+        _TS_CACHE[1] = datetime.utcfromtimestamp(t).isoformat() + 'Z'
+    return _TS_CACHE[1]
+
+
 def can_fetch_url(url: str, user_agent: str) -> Tuple[bool, str]:
     """
     Vérifie si l'URL peut être scrapée selon robots.txt
@@ -63,20 +246,19 @@ def can_fetch_url(url: str, user_agent: str) -> Tuple[bool, str]:
     try:
         parsed = urlparse(url)
         base_url = f"{parsed.scheme}://{parsed.netloc}"
-        
-        rp = robots_cache.get_parser(base_url)
-        if rp is None:
+
+        rules = robots_cache.get_rules(base_url)
+        if rules is None:
             return True, "robots.txt not found or accessible"
-        
-        can_fetch = rp.can_fetch(user_agent, url)
-        if not can_fetch:
+
+        # Un seul match de la regex compilée sur le chemin
+        if not rules.can_fetch(parsed.path or '/'):
             return False, "blocked by robots.txt"
-        
+
         # Vérifier le Crawl-delay si présent
-        crawl_delay = rp.crawl_delay(user_agent)
-        if crawl_delay and crawl_delay > RATE_LIMIT_DELAY:
-            logger.info(f"Crawl-delay for {base_url}: {crawl_delay}s")
-        
+        if rules.crawl_delay and rules.crawl_delay > RATE_LIMIT_DELAY:
+            logger.info(f"Crawl-delay for {base_url}: {rules.crawl_delay}s")
+
         return True, "allowed by robots.txt"
         
     except Exception as e:
@@ -84,42 +266,55 @@ def can_fetch_url(url: str, user_agent: str) -> Tuple[bool, str]:
         return True, f"robots.txt check failed: {str(e)}"
 
 
-def fetch_html(url: str, retry_count: int = 0) -> Tuple[Optional[str], str, int]:
+def fetch_html(url: str) -> Tuple[Optional[str], str, int]:
     """
     Récupère le HTML d'une URL
-    
+
+    Les retries sont itératifs (pas de récursion qui empile des frames)
+    avec backoff exponentiel : 0.5s, 1s, 2s... La connexion keep-alive
+    de la session est réutilisée d'une tentative à l'autre.
+
     Returns:
         (html_content, status_message, http_status_code)
     """
-    try:
-        response = requests.get(
-            url,
-            headers=REQUEST_HEADERS,
-            timeout=REQUEST_TIMEOUT,
-            allow_redirects=True
-        )
-        
-        if response.status_code == 200:
-            return response.text, "success", 200
-        else:
-            return None, f"HTTP {response.status_code}", response.status_code
-            
-    except requests.Timeout:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Timeout pour {url}, retry {retry_count + 1}/{MAX_RETRIES}")
-            time.sleep(2)
-            return fetch_html(url, retry_count + 1)
-        return None, "timeout", 0
-        
-    except requests.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Erreur pour {url}, retry {retry_count + 1}/{MAX_RETRIES}: {e}")
-            time.sleep(2)
-            return fetch_html(url, retry_count + 1)
-        return None, f"request_error: {str(e)}", 0
-        
-    except Exception as e:
-        return None, f"unexpected_error: {str(e)}", 0
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            # Lecture streamée plafonnée : les JSON-LD sont en tête de page,
+            # au-delà de MAX_HTML_BYTES le reste du corps n'est ni téléchargé
+            # ni parsé
+            with _SESSION.get(
+                url,
+                timeout=REQUEST_TIMEOUT,
+                allow_redirects=True,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    return None, f"HTTP {response.status_code}", response.status_code
+
+                buf = bytearray()
+                for chunk in response.iter_content(16384):
+                    buf.extend(chunk)
+                    if len(buf) >= MAX_HTML_BYTES:
+                        logger.debug(f"HTML tronqué à {MAX_HTML_BYTES} octets pour {url}")
+                        break
+
+                html = bytes(buf).decode(response.encoding or 'utf-8', errors='replace')
+                return html, "success", 200
+
+        except requests.Timeout:
+            if attempt == MAX_RETRIES:
+                return None, "timeout", 0
+            logger.warning(f"Timeout pour {url}, retry {attempt + 1}/{MAX_RETRIES}")
+            time.sleep(2 ** attempt * 0.5)
+
+        except requests.RequestException as e:
+            if attempt == MAX_RETRIES:
+                return None, f"request_error: {str(e)}", 0
+            logger.warning(f"Erreur pour {url}, retry {attempt + 1}/{MAX_RETRIES}: {e}")
+            time.sleep(2 ** attempt * 0.5)
+
+        except Exception as e:
+            return None, f"unexpected_error: {str(e)}", 0
 
 
 def extract_jsonld(html: str) -> List[Dict]:
@@ -129,34 +324,54 @@ def extract_jsonld(html: str) -> List[Dict]:
     Returns:
         Liste des objets JSON-LD trouvés
     """
+    # Chemin rapide : scan regex précompilé, des ordres de grandeur
+    # moins cher que le parse HTML complet. Au moindre bloc qui ne
+    # décode pas (balisage piégeux, JSON cassé), on laisse le vrai
+    # parseur trancher
+    matches = _JSONLD_RE.findall(html)
+    if matches:
+        try:
+            blocks = []
+            for content in matches:
+                data = _json_loads(content)
+                if isinstance(data, list):
+                    blocks.extend(data)
+                else:
+                    blocks.append(data)
+            return blocks
+        except ValueError:
+            pass
+
     jsonld_blocks = []
-    
+
     try:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Chercher tous les scripts de type application/ld+json
-        scripts = soup.find_all('script', type='application/ld+json')
-        
-        for script in scripts:
+        # lxml interrogé directement en XPath : le parse et la recherche
+        # des scripts restent entièrement en C, sans construction de
+        # l'arbre d'objets Python de BeautifulSoup
+        tree = lxml.html.fromstring(html)
+        contents = tree.xpath('//script[@type="application/ld+json"]/text()')
+
+        for content in contents:
             try:
-                content = script.string
-                if content:
-                    # Parser le JSON
-                    data = json.loads(content)
-                    
-                    # Gérer le cas d'un tableau de JSON-LD
-                    if isinstance(data, list):
-                        jsonld_blocks.extend(data)
-                    else:
-                        jsonld_blocks.append(data)
-                        
-            except json.JSONDecodeError as e:
+                # Parser le JSON. str() ramène le texte XPath (sous-classe
+                # de str propre à lxml) à un str natif, seul type que le
+                # décodeur orjson accepte
+                data = _json_loads(str(content))
+
+                # Gérer le cas d'un tableau de JSON-LD
+                if isinstance(data, list):
+                    jsonld_blocks.extend(data)
+                else:
+                    jsonld_blocks.append(data)
+
+            # ValueError couvre les JSONDecodeError d'orjson et du stdlib
+            except ValueError as e:
                 logger.warning(f"JSON invalide trouvé: {str(e)[:100]}")
                 continue
-                
+
     except Exception as e:
         logger.error(f"Erreur extraction JSON-LD: {e}")
-    
+
     return jsonld_blocks
 
 
@@ -181,7 +396,7 @@ def scrape_url(url: str, enforce_rate_limit: bool = True) -> Dict:
         'error_reason': None,
         'json_ld': [],
         'json_ld_count': 0,
-        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'timestamp': _now_iso(),
         'http_status': 0
     }
     
@@ -192,9 +407,10 @@ def scrape_url(url: str, enforce_rate_limit: bool = True) -> Dict:
         logger.info(f"❌ {url} - {robots_reason}")
         return result
     
-    # Respecter le rate limit
+    # Respecter le rate limit (par hôte : les autres hôtes ne sont pas
+    # pénalisés par ce délai)
     if enforce_rate_limit:
-        time.sleep(RATE_LIMIT_DELAY)
+        _rate_limiter.wait(urlparse(url).netloc)
     
     # Fetch HTML
     html, status_msg, http_status = fetch_html(url)
@@ -224,22 +440,27 @@ def scrape_url(url: str, enforce_rate_limit: bool = True) -> Dict:
 
 def scrape_urls_batch(urls: List[str], start_index: int = 0) -> List[Dict]:
     """
-    Scrape un batch d'URLs avec gestion du rate limiting
-    
+    Scrape un batch d'URLs en parallèle avec gestion du rate limiting
+
+    Le scraping est dominé par la latence réseau : les URLs sont
+    réparties sur un pool de threads et seules les requêtes vers un même
+    hôte sont espacées de RATE_LIMIT_DELAY (via _HostRateLimiter).
+    executor.map préserve l'ordre des résultats.
+
     Args:
         urls: Liste des URLs à scraper
         start_index: Index de départ (pour reprendre après interruption)
-    
+
     Returns:
-        Liste des résultats
+        Liste des résultats (dans l'ordre des URLs d'entrée)
     """
-    results = []
     total = len(urls)
-    
-    for i, url in enumerate(urls[start_index:], start=start_index):
-        logger.info(f"[{i+1}/{total}] Scraping {url}")
-        
-        result = scrape_url(url)
-        results.append(result)
-    
+    results = []
+
+    with ThreadPoolExecutor(max_workers=VALIDATION_MAX_WORKERS) as executor:
+        for i, result in enumerate(executor.map(scrape_url, urls[start_index:]),
+                                   start=start_index):
+            logger.info(f"[{i+1}/{total}] Scrapé {result['url']}")
+            results.append(result)
+
     return results
@@ -3,51 +3,138 @@ Module de parsing de sitemaps XML
 """
 
 import requests
-import xml.etree.ElementTree as ET
 import gzip
+import heapq
 import logging
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from operator import itemgetter
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional, Set
+from typing import Iterator, List, Dict, Optional, Set
 from io import BytesIO
 
 from .discovery_config import (
     SITEMAP_TIMEOUT, SITEMAP_COMMON_PATHS,
-    MAX_SITEMAP_SIZE_MB, DISCOVERY_RATE_LIMIT
+    MAX_SITEMAP_SIZE_MB, DISCOVERY_RATE_LIMIT, DISCOVERY_MAX_WORKERS
 )
+from .scraper import _HostRateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Politesse par hôte pour les fetches de sitemaps : les sous-sitemaps
+# d'un même hôte restent espacés de DISCOVERY_RATE_LIMIT, ceux servis
+# par d'autres hôtes (CDN...) se recouvrent librement
+_rate_limiter = _HostRateLimiter(DISCOVERY_RATE_LIMIT)
+
+
+@lru_cache(maxsize=512)
+def _robots_sitemaps(base_url: str, user_agent: str) -> tuple:
+    """
+    URLs `Sitemap:` déclarées dans le robots.txt d'un hôte
+
+    Mémoïsé à l'échelle du process : chaque SitemapParser créé pour le
+    même hôte (re-runs, reprises après checkpoint...) réutilise le
+    résultat au lieu de re-télécharger et re-scanner le fichier — un
+    seul passage sur les lignes, toutes les entrées collectées d'un coup
+    """
+    robots_url = urljoin(base_url, '/robots.txt')
+    try:
+        response = requests.get(
+            robots_url,
+            headers={'User-Agent': user_agent},
+            timeout=SITEMAP_TIMEOUT
+        )
+        if response.status_code != 200:
+            return ()
+        return tuple(
+            line.split(':', 1)[1].strip()
+            for line in response.text.splitlines()
+            if line.lower().startswith('sitemap:')
+        )
+    except Exception as e:
+        logger.debug(f"  Erreur lecture robots.txt: {e}")
+        return ()
+
+
+class _CappedStream:
+    """
+    Fichier en lecture seule plafonné en octets
+
+    Applique MAX_SITEMAP_SIZE_MB pendant le streaming : au-delà de la
+    borne, la lecture lève et le parsing s'arrête sur les entrées déjà
+    consommées au lieu de télécharger le reste
+    """
+    __slots__ = ('_fileobj', '_remaining')
+
+    def __init__(self, fileobj, max_bytes: int):
+        self._fileobj = fileobj
+        self._remaining = max_bytes
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise ValueError(f"sitemap au-delà de {MAX_SITEMAP_SIZE_MB} MB, lecture arrêtée")
+        return data
+
 
 class SitemapParser:
     """Parser de sitemaps XML avec support des sitemaps imbriqués"""
     
-    def __init__(self, base_url: str, user_agent: str):
+    def __init__(self, base_url: str, user_agent: str, session: requests.Session = None):
         self.base_url = base_url.rstrip('/')
         self.user_agent = user_agent
         self.parsed_sitemaps = set()  # Éviter les boucles infinies
+        self._parsed_lock = threading.Lock()  # parsed_sitemaps partagé entre workers
+        # URLs déjà émises : les sitemaps par catégorie et le sitemap
+        # global listent souvent les mêmes pages, chaque doublon évité
+        # ici est un pré-scoring de moins en aval
+        self.seen_urls = set()
+
+        # Session partagée entre tous les fetches du domaine (robots.txt,
+        # HEAD de découverte, sitemaps) : la connexion TCP+TLS est
+        # négociée une fois puis réutilisée en keep-alive, au lieu d'une
+        # poignée de main par requête. L'appelant peut fournir sa propre
+        # session (réutilisée d'un domaine à l'autre, re-runs...) — elle
+        # reste alors sous sa responsabilité et n'est pas fermée ici
+        if session is not None:
+            self.session = session
+            self._owns_session = False
+        else:
+            self.session = requests.Session()
+            self.session.headers['User-Agent'] = user_agent
+            # Pools dimensionnés pour le BFS parallèle
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=DISCOVERY_MAX_WORKERS,
+                pool_maxsize=DISCOVERY_MAX_WORKERS
+            )
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self._owns_session = True
+
+    def close(self):
+        """Ferme la session HTTP (et ses connexions keep-alive) si possédée"""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
         
     def find_sitemap_url(self) -> Optional[str]:
         """
         Trouve l'URL du sitemap principal
         Essaie plusieurs chemins communs + robots.txt
         """
-        # 1. Vérifier robots.txt
-        try:
-            robots_url = urljoin(self.base_url, '/robots.txt')
-            response = requests.get(
-                robots_url,
-                headers={'User-Agent': self.user_agent},
-                timeout=SITEMAP_TIMEOUT
-            )
-            
-            if response.status_code == 200:
-                for line in response.text.split('\n'):
-                    if line.lower().startswith('sitemap:'):
-                        sitemap_url = line.split(':', 1)[1].strip()
-                        logger.info(f"  Sitemap trouvé dans robots.txt: {sitemap_url}")
-                        return sitemap_url
-        except Exception as e:
-            logger.debug(f"  Erreur lecture robots.txt: {e}")
+        # 1. Vérifier robots.txt (résultat mémoïsé par hôte)
+        sitemaps = _robots_sitemaps(self.base_url, self.user_agent)
+        if sitemaps:
+            logger.info(f"  Sitemap trouvé dans robots.txt: {sitemaps[0]}")
+            return sitemaps[0]
         
         # 2. Essayer les chemins communs
         for path in SITEMAP_COMMON_PATHS:
@@ -56,9 +143,8 @@ class SitemapParser:
                 
             sitemap_url = urljoin(self.base_url, path)
             try:
-                response = requests.head(
+                response = self.session.head(
                     sitemap_url,
-                    headers={'User-Agent': self.user_agent},
                     timeout=SITEMAP_TIMEOUT,
                     allow_redirects=True
                 )
@@ -72,37 +158,46 @@ class SitemapParser:
         logger.warning(f"  Aucun sitemap trouvé pour {self.base_url}")
         return None
     
-    def fetch_sitemap(self, sitemap_url: str) -> Optional[bytes]:
-        """Récupère le contenu d'un sitemap"""
+    def fetch_and_parse(self, sitemap_url: str) -> Optional[Dict[str, List]]:
+        """
+        Télécharge et parse un sitemap en streaming
+
+        Le flux HTTP brut est branché directement sur iterparse (avec
+        décompression gzip au fil de l'eau si besoin) : le parsing
+        recouvre le téléchargement et le XML n'est jamais matérialisé
+        en mémoire, ni compressé ni décompressé
+        """
         try:
-            response = requests.get(
+            with self.session.get(
                 sitemap_url,
-                headers={'User-Agent': self.user_agent},
                 timeout=SITEMAP_TIMEOUT,
                 stream=True
-            )
-            
-            if response.status_code != 200:
-                logger.warning(f"  Sitemap {sitemap_url} retourne {response.status_code}")
-                return None
-            
-            # Vérifier la taille
-            content_length = response.headers.get('content-length')
-            if content_length and int(content_length) > MAX_SITEMAP_SIZE_MB * 1024 * 1024:
-                logger.warning(f"  Sitemap trop gros: {content_length} bytes")
-                return None
-            
-            content = response.content
-            
-            # Décompresser si gzip
-            if sitemap_url.endswith('.gz') or response.headers.get('content-encoding') == 'gzip':
-                try:
-                    content = gzip.decompress(content)
-                except:
-                    pass
-            
-            return content
-            
+            ) as response:
+
+                if response.status_code != 200:
+                    logger.warning(f"  Sitemap {sitemap_url} retourne {response.status_code}")
+                    return None
+
+                # Vérifier la taille annoncée
+                content_length = response.headers.get('content-length')
+                if content_length and int(content_length) > MAX_SITEMAP_SIZE_MB * 1024 * 1024:
+                    logger.warning(f"  Sitemap trop gros: {content_length} bytes")
+                    return None
+
+                # urllib3 décode le Content-Encoding (gzip/deflate) en route
+                raw = response.raw
+                raw.decode_content = True
+
+                # La borne s'applique pendant la lecture, même sans
+                # content-length annoncé
+                fileobj = _CappedStream(raw, MAX_SITEMAP_SIZE_MB * 1024 * 1024)
+
+                # Fichiers .gz servis tels quels (hors Content-Encoding)
+                if sitemap_url.endswith('.gz'):
+                    fileobj = gzip.GzipFile(fileobj=fileobj)
+
+                return self._parse_sitemap_stream(fileobj)
+
         except Exception as e:
             logger.error(f"  Erreur fetch sitemap {sitemap_url}: {e}")
             return None
@@ -112,134 +207,217 @@ class SitemapParser:
         Parse le XML d'un sitemap
         Retourne {'urls': [...], 'sitemaps': [...]}
         """
+        return self._parse_sitemap_stream(BytesIO(xml_content))
+
+    @staticmethod
+    def _parse_sitemap_stream(fileobj) -> Dict[str, List]:
+        """
+        Parse un sitemap en streaming via lxml iterparse
+
+        Un seul passage C (libxml2) sur le document au lieu de trois
+        parcours findall de l'arbre ElementTree complet. Chaque entrée
+        est libérée dès qu'elle est traitée (clear + élagage des
+        siblings précédents) : la mémoire reste constante même sur un
+        sitemap de 50k URLs. Le wildcard {*} absorbe le namespace pour
+        la sélection des entrées ; leurs enfants sont ensuite lus par
+        comparaison directe de tags précalculés au premier élément
+        (namespace détecté une fois), sans évaluation de chemin
+        findtext par champ
+        """
         result = {'urls': [], 'sitemaps': []}
-        
+
+        # Tags enfants précalculés à la volée dès le premier élément
+        ns_uri = loc_tag = lastmod_tag = priority_tag = None
+
         try:
-            root = ET.fromstring(xml_content)
-            
-            # Détecter le namespace
-            namespace = ''
-            if root.tag.startswith('{'):
-                namespace = root.tag.split('}')[0] + '}'
-            
-            # Parser sitemap index (contient d'autres sitemaps)
-            for sitemap in root.findall(f'.//{namespace}sitemap'):
-                loc_elem = sitemap.find(f'{namespace}loc')
-                if loc_elem is not None and loc_elem.text:
-                    result['sitemaps'].append(loc_elem.text.strip())
-            
-            # Parser URL set (contient des URLs)
-            for url_elem in root.findall(f'.//{namespace}url'):
-                loc_elem = url_elem.find(f'{namespace}loc')
-                if loc_elem is not None and loc_elem.text:
-                    url_data = {'loc': loc_elem.text.strip()}
-                    
-                    # Extraire lastmod si présent
-                    lastmod_elem = url_elem.find(f'{namespace}lastmod')
-                    if lastmod_elem is not None and lastmod_elem.text:
-                        url_data['lastmod'] = lastmod_elem.text.strip()
-                    
-                    # Extraire priority si présent
-                    priority_elem = url_elem.find(f'{namespace}priority')
-                    if priority_elem is not None and priority_elem.text:
+            context = etree.iterparse(
+                fileobj, events=('end',), tag=('{*}sitemap', '{*}url')
+            )
+            for _, elem in context:
+                qname = etree.QName(elem)
+                if loc_tag is None or qname.namespace != ns_uri:
+                    ns_uri = qname.namespace
+                    prefix = '{' + ns_uri + '}' if ns_uri else ''
+                    loc_tag = prefix + 'loc'
+                    lastmod_tag = prefix + 'lastmod'
+                    priority_tag = prefix + 'priority'
+
+                # Micro-boucle sur les enfants : une comparaison de tag
+                # (identité de chaînes internées côté libxml2) par champ
+                loc = lastmod = priority = None
+                for child in elem:
+                    tag = child.tag
+                    if tag == loc_tag:
+                        loc = child.text
+                    elif tag == lastmod_tag:
+                        lastmod = child.text
+                    elif tag == priority_tag:
+                        priority = child.text
+
+                if qname.localname == 'sitemap':
+                    # Entrée de sitemap index (pointe vers un autre sitemap)
+                    if loc:
+                        result['sitemaps'].append(str(loc.strip()))
+                elif loc:
+                    url_data = {'loc': str(loc.strip())}
+
+                    # lastmod si présent
+                    if lastmod:
+                        url_data['lastmod'] = str(lastmod.strip())
+
+                    # priority si présent
+                    if priority:
                         try:
-                            url_data['priority'] = float(priority_elem.text.strip())
-                        except:
+                            url_data['priority'] = float(priority.strip())
+                        except ValueError:
                             url_data['priority'] = 0.5
                     else:
                         url_data['priority'] = 0.5
-                    
+
                     result['urls'].append(url_data)
-            
+
+                # Libérer l'entrée traitée et les siblings déjà consommés
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
             return result
-            
-        except ET.ParseError as e:
+
+        except etree.XMLSyntaxError as e:
             logger.error(f"  Erreur parsing XML: {e}")
             return result
         except Exception as e:
             logger.error(f"  Erreur inattendue parsing sitemap: {e}")
             return result
     
-    def discover_all_urls(self, max_depth: int = 3) -> List[Dict]:
+    def _fetch_and_parse_polite(self, sitemap_url: str) -> Optional[Dict[str, List]]:
+        """fetch_and_parse précédé de l'attente du créneau de l'hôte"""
+        _rate_limiter.wait(urlparse(sitemap_url).netloc)
+        return self.fetch_and_parse(sitemap_url)
+
+    def iter_urls(self, max_depth: int = 3) -> Iterator[Dict]:
         """
-        Découvre toutes les URLs depuis le sitemap principal
-        Suit les sitemaps imbriqués jusqu'à max_depth
-        
-        Returns:
-            List[{'url': str, 'priority': float, 'lastmod': str}]
+        Découvre les URLs depuis le sitemap principal, en flux
+
+        Les sitemaps sont parcourus en BFS par niveau : tous les
+        sitemaps d'une même profondeur sont téléchargés en parallèle
+        (IO-bound), si bien qu'un sitemap index à N enfants coûte la
+        latence max d'un niveau et non la somme. Les requêtes vers un
+        même hôte restent espacées par le rate limiter. Des threads
+        plutôt que de l'asyncio : le téléchargement attend surtout le
+        réseau, le pool donne le même recouvrement de latences sans
+        dédoubler la pile HTTP (requests reste l'unique client, avec
+        ses pools de connexions et ses retries déjà configurés).
+
+        Chaque URL est yieldée dès que son sitemap est parsé : le
+        consommateur (pré-scoring, scraping) démarre après le premier
+        sitemap au lieu d'attendre la fin du BFS, et rien n'impose de
+        matérialiser la liste complète.
+
+        Yields:
+            {'url': str, 'priority': float, 'lastmod': str, 'source': str}
         """
-        all_urls = []
-        
+        yielded = 0
+
         # Trouver le sitemap principal
         main_sitemap = self.find_sitemap_url()
         if not main_sitemap:
-            return all_urls
-        
-        # Parser récursivement
-        to_parse = [(main_sitemap, 0)]  # (url, depth)
-        
-        while to_parse:
-            sitemap_url, depth = to_parse.pop(0)
-            
-            # Éviter les boucles
-            if sitemap_url in self.parsed_sitemaps:
-                continue
-            
-            if depth > max_depth:
-                logger.debug(f"  Max depth atteint pour {sitemap_url}")
-                continue
-            
-            self.parsed_sitemaps.add(sitemap_url)
-            logger.debug(f"  Parsing sitemap (depth {depth}): {sitemap_url}")
-            
-            # Fetch et parse
-            xml_content = self.fetch_sitemap(sitemap_url)
-            if not xml_content:
-                continue
-            
-            parsed = self.parse_sitemap_xml(xml_content)
-            
-            # Ajouter les URLs trouvées
-            for url_data in parsed['urls']:
-                all_urls.append({
-                    'url': url_data['loc'],
-                    'priority': url_data.get('priority', 0.5),
-                    'lastmod': url_data.get('lastmod', ''),
-                    'source': 'sitemap'
-                })
-            
-            # Ajouter les sous-sitemaps à parser
-            for sub_sitemap in parsed['sitemaps']:
-                to_parse.append((sub_sitemap, depth + 1))
-        
-        logger.info(f"  ✅ {len(all_urls)} URLs découvertes depuis sitemaps")
-        return all_urls
+            return
+
+        level = [main_sitemap]
+        depth = 0
+
+        with ThreadPoolExecutor(max_workers=DISCOVERY_MAX_WORKERS) as executor:
+            while level and depth <= max_depth:
+                # Dédupliquer le niveau (éviter les boucles) sous verrou
+                with self._parsed_lock:
+                    to_fetch = []
+                    for sitemap_url in level:
+                        if sitemap_url not in self.parsed_sitemaps:
+                            self.parsed_sitemaps.add(sitemap_url)
+                            to_fetch.append(sitemap_url)
+
+                if not to_fetch:
+                    break
+
+                logger.debug(f"  Parsing de {len(to_fetch)} sitemap(s) (depth {depth})")
+
+                next_level = []
+                for parsed in executor.map(self._fetch_and_parse_polite, to_fetch):
+                    if not parsed:
+                        continue
+
+                    # Émettre les URLs trouvées (dédupliquées à la
+                    # volée : les résultats d'executor.map sont
+                    # consommés par ce seul thread, pas de verrou)
+                    for url_data in parsed['urls']:
+                        loc = url_data['loc']
+                        if loc in self.seen_urls:
+                            continue
+                        self.seen_urls.add(loc)
+                        yielded += 1
+                        # Dict plutôt que classe à slots : ces
+                        # enregistrements traversent le pipeline en
+                        # streaming (jamais 10k en vie à la fois),
+                        # partent tels quels dans orjson pour le JSONL
+                        # et finissent absorbés par UrlRecord(**url_data)
+                        # — qui, lui, est un dataclass slots=True
+                        yield {
+                            'url': loc,
+                            'priority': url_data.get('priority', 0.5),
+                            'lastmod': url_data.get('lastmod', ''),
+                            'source': 'sitemap'
+                        }
+
+                    # Les sous-sitemaps forment le niveau suivant
+                    next_level.extend(parsed['sitemaps'])
+
+                level = next_level
+                depth += 1
+
+        if level:
+            logger.debug(f"  Max depth atteint, {len(level)} sitemap(s) non suivis")
+
+        logger.info(f"  ✅ {yielded} URLs découvertes depuis sitemaps")
+
+    def discover_all_urls(self, max_depth: int = 3) -> List[Dict]:
+        """
+        Liste complète des URLs découvertes (enveloppe de iter_urls)
+
+        Returns:
+            List[{'url': str, 'priority': float, 'lastmod': str}]
+        """
+        return list(self.iter_urls(max_depth))
 
 
 def discover_urls_from_sitemap(
     domain_url: str,
     user_agent: str,
-    max_urls: int = 1000
+    max_urls: int = 1000,
+    session: requests.Session = None
 ) -> List[Dict]:
     """
     Point d'entrée principal pour découvrir les URLs d'un domaine
-    
+
     Args:
         domain_url: URL du domaine (ex: https://example.com)
         user_agent: User-Agent à utiliser
         max_urls: Nombre max d'URLs à retourner
-    
+        session: Session HTTP à réutiliser (sinon une session dédiée
+            est créée et fermée avec le parser)
+
     Returns:
         List[{'url': str, 'priority': float, 'lastmod': str, 'source': str}]
     """
-    parser = SitemapParser(domain_url, user_agent)
-    urls = parser.discover_all_urls()
-    
-    # Limiter si nécessaire
-    if len(urls) > max_urls:
-        # Trier par priorité décroissante
-        urls.sort(key=lambda x: x.get('priority', 0.5), reverse=True)
-        urls = urls[:max_urls]
+    # Top-K par priorité directement sur le flux du BFS : le tas de K
+    # éléments est le seul endroit où des URLs s'accumulent, la liste
+    # complète n'est jamais matérialisée
+    with SitemapParser(domain_url, user_agent, session=session) as parser:
+        urls = heapq.nlargest(
+            max_urls, parser.iter_urls(), key=itemgetter('priority')
+        )
+
+    if len(urls) == max_urls:
         logger.info(f"  Limité à {max_urls} URLs (trié par priorité)")
-    
+
     return urls
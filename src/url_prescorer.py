@@ -3,15 +3,29 @@ Module de pré-scoring des URLs découvertes
 Score de 0-100 pour prioriser les URLs avant le scraping complet
 """
 
+import heapq
 import logging
-from urllib.parse import urlparse, parse_qs
-from typing import Dict, List
+import re
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import numpy as np  # Arithmétique de scoring vectorisée sur les batchs
+except ImportError:
+    np = None
+
+try:
+    import numba  # JIT du kernel numérique quand disponible
+except ImportError:
+    numba = None
 
 from .discovery_config import (
-    UNIVERSAL_PRIORITY_PATTERNS,
-    CONTENT_TYPE_PATTERNS,
-    EXCLUDE_PATTERNS,
-    IGNORE_EXTENSIONS,
+    UNIVERSAL_PRIORITY_RE,
+    CONTENT_TYPE_RES,
+    EXCLUDE_RE,
+    IGNORE_EXTENSIONS_RE,
     OPTIMAL_DEPTH_MIN,
     OPTIMAL_DEPTH_MAX,
     PRE_SCORE_WEIGHTS
@@ -20,32 +34,103 @@ from .discovery_config import (
 logger = logging.getLogger(__name__)
 
 
-def calculate_pattern_match_score(url: str, category_patterns: List[str] = None) -> float:
+def _split_url(url: str):
     """
-    Score basé sur le match avec les patterns prioritaires
-    Returns: 0-40 points
+    Découpe (path, query, fragment) par opérations str pures
+
+    urlparse + parse_qs allouaient un ParseResult et un dict de listes
+    par URL juste pour compter des paramètres et tester un fragment ;
+    ici trois partitions C suffisent
     """
-    url_lower = url.lower()
+    base, _, fragment = url.partition('#')
+    base, _, query = base.partition('?')
+
+    # Chemin : ce qui suit scheme://host
+    scheme_end = base.find('://')
+    host_start = scheme_end + 3 if scheme_end >= 0 else 0
+    path_start = base.find('/', host_start)
+    path = base[path_start:] if path_start >= 0 else ''
+
+    return path, query, fragment
+
+
+# Types de contenu prioritaires pour les IA (bonus maximal)
+_PRIORITY_CONTENT_TYPES = ('faq', 'howto', 'article', 'recipe')
+
+
+@lru_cache(maxsize=64)
+def _prepared_patterns(category_patterns: tuple) -> tuple:
+    """
+    Patterns de catégorie minusculisés, mémoïsés par jeu de patterns
+
+    Un run ne manipule qu'une poignée de jeux (un par catégorie) mais
+    les confronte à des milliers d'URLs : la préparation est payée une
+    fois par jeu au lieu d'une fois par URL
+    """
+    return tuple(pattern.lower() for pattern in category_patterns)
+
+
+def _score_patterns_and_type(url_lower: str, category_patterns: List[str] = None):
+    """
+    Passe fusionnée : score de patterns, type de contenu et bonus
+
+    pattern_match, detect_content_type et content_type_bonus
+    partageaient les mêmes scans de CONTENT_TYPE_RES et relowercasaient
+    l'URL à chaque appel — ici l'URL déjà minuscule est parcourue une
+    seule fois et les trois sorties sont dérivées du même passage.
+
+    Returns:
+        (pattern_score, content_type, content_type_bonus)
+    """
+    # Type de contenu : premier type dont l'union précompilée matche
+    content_type = 'unknown'
+    for candidate, content_type_re in CONTENT_TYPE_RES.items():
+        if content_type_re.search(url_lower):
+            content_type = candidate
+            break
+
     score = 0.0
-    
-    # Patterns universels (haute priorité)
-    universal_matches = sum(1 for pattern in UNIVERSAL_PRIORITY_PATTERNS if pattern in url_lower)
+
+    # Patterns universels (haute priorité) : un seul scan de l'union
+    # précompilée, comptage des patterns distincts matchés
+    universal_matches = len(set(UNIVERSAL_PRIORITY_RE.findall(url_lower)))
     if universal_matches > 0:
         score += min(universal_matches * 15, 30)  # Max 30 points
-    
-    # Patterns de contenu (bonus)
-    for content_type, patterns in CONTENT_TYPE_PATTERNS.items():
-        if any(pattern in url_lower for pattern in patterns):
-            score += 10  # +10 pour chaque type de contenu détecté
-            break  # Une seule fois
-    
-    # Patterns spécifiques à la catégorie (si fournis)
+
+    # Type de contenu détecté : +10 (une seule fois)
+    if content_type != 'unknown':
+        score += 10
+
+    # Patterns spécifiques à la catégorie (si fournis) : le tuple
+    # minusculisé est préparé une fois par jeu de patterns, pas un
+    # .lower() par pattern et par URL
     if category_patterns:
-        category_matches = sum(1 for pattern in category_patterns if pattern.lower() in url_lower)
+        if category_patterns.__class__ is not tuple:
+            category_patterns = tuple(category_patterns)
+        patterns = _prepared_patterns(category_patterns)
+        category_matches = sum(1 for pattern in patterns if pattern in url_lower)
         if category_matches > 0:
             score += min(category_matches * 5, 15)
-    
-    return min(score, 40)  # Max 40 points
+
+    pattern_score = min(score, 40)  # Max 40 points
+
+    # Bonus selon le type détecté
+    if content_type in _PRIORITY_CONTENT_TYPES:
+        content_type_bonus = 10.0
+    elif content_type != 'unknown':
+        content_type_bonus = 5.0
+    else:
+        content_type_bonus = 0.0
+
+    return pattern_score, content_type, content_type_bonus
+
+
+def calculate_pattern_match_score(url: str, category_patterns: List[str] = None) -> float:
+    """
+    Score basé sur le match avec les patterns prioritaires
+    Returns: 0-40 points
+    """
+    return _score_patterns_and_type(url.lower(), category_patterns)[0]
 
 
 def calculate_depth_score(url: str) -> float:
@@ -53,30 +138,31 @@ def calculate_depth_score(url: str) -> float:
     Score basé sur la profondeur de l'URL dans l'arborescence
     Returns: 0-20 points
     """
-    try:
-        parsed = urlparse(url)
-        path = parsed.path.strip('/')
-        
-        if not path:
-            # Homepage
-            return 5  # Peut avoir Organization schema, mais pas optimal
-        
-        depth = path.count('/') + 1
-        
-        if OPTIMAL_DEPTH_MIN <= depth <= OPTIMAL_DEPTH_MAX:
-            # Profondeur optimale
-            return 20
-        elif depth < OPTIMAL_DEPTH_MIN:
-            # Trop peu profond (mais mieux que homepage)
-            return 10
-        else:
-            # Trop profond (pénalité croissante)
-            penalty = (depth - OPTIMAL_DEPTH_MAX) * 3
-            return max(0, 15 - penalty)
-    
-    except Exception as e:
-        logger.debug(f"Erreur calcul depth pour {url}: {e}")
-        return 5
+    path = _split_url(url)[0].strip('/')
+
+    if not path:
+        # Homepage
+        return 5  # Peut avoir Organization schema, mais pas optimal
+
+    depth = path.count('/') + 1
+
+    if OPTIMAL_DEPTH_MIN <= depth <= OPTIMAL_DEPTH_MAX:
+        # Profondeur optimale
+        return 20
+    elif depth < OPTIMAL_DEPTH_MIN:
+        # Trop peu profond (mais mieux que homepage)
+        return 10
+    else:
+        # Trop profond (pénalité croissante)
+        penalty = (depth - OPTIMAL_DEPTH_MAX) * 3
+        return max(0, 15 - penalty)
+
+
+# Indicateurs de session IDs / tracking params, en union compilée :
+# un seul scan C de l'URL au lieu d'un test de sous-chaîne par indicateur
+_TRACKING_RE = re.compile('|'.join(map(re.escape, (
+    'sessionid', 'sid', 'utm_', 'fbclid', 'gclid'
+))))
 
 
 def calculate_cleanliness_score(url: str) -> float:
@@ -85,42 +171,34 @@ def calculate_cleanliness_score(url: str) -> float:
     Returns: 0-15 points
     """
     score = 15.0
-    
-    try:
-        parsed = urlparse(url)
-        
-        # Pénalité pour paramètres de requête
-        query_params = parse_qs(parsed.query)
-        if len(query_params) == 0:
-            # Pas de params = parfait
-            pass
-        elif len(query_params) <= 2:
-            # Peu de params = OK
-            score -= 3
-        else:
-            # Beaucoup de params = mauvais signe
-            score -= 8
-        
-        # Pénalité pour fragments
-        if parsed.fragment:
-            score -= 2
-        
-        # Pénalité pour URLs très longues
-        if len(url) > 150:
-            score -= 3
-        elif len(url) > 200:
-            score -= 5
-        
-        # Vérifier la présence de session IDs ou tracking params
-        tracking_indicators = ['sessionid', 'sid', 'utm_', 'fbclid', 'gclid']
-        if any(indicator in url.lower() for indicator in tracking_indicators):
-            score -= 5
-        
-        return max(0, score)
-        
-    except Exception as e:
-        logger.debug(f"Erreur calcul cleanliness pour {url}: {e}")
-        return 5
+
+    _, query, fragment = _split_url(url)
+
+    # Pénalité pour paramètres de requête (un `=` par paramètre)
+    n_params = query.count('=') if query else 0
+    if n_params == 0:
+        # Pas de params = parfait
+        pass
+    elif n_params <= 2:
+        # Peu de params = OK
+        score -= 3
+    else:
+        # Beaucoup de params = mauvais signe
+        score -= 8
+
+    # Pénalité pour fragments
+    if fragment:
+        score -= 2
+
+    # Pénalité pour URLs très longues
+    if len(url) > 150:
+        score -= 3
+
+    # Vérifier la présence de session IDs ou tracking params
+    if _TRACKING_RE.search(url.lower()):
+        score -= 5
+
+    return max(0, score)
 
 
 def calculate_sitemap_priority_score(priority: float) -> float:
@@ -137,26 +215,15 @@ def detect_content_type(url: str) -> str:
     Détecte le type de contenu probable depuis l'URL
     Returns: 'faq', 'howto', 'article', 'product', 'recipe', 'job', 'event', 'unknown'
     """
-    url_lower = url.lower()
-    
-    for content_type, patterns in CONTENT_TYPE_PATTERNS.items():
-        if any(pattern in url_lower for pattern in patterns):
-            return content_type
-    
-    return 'unknown'
+    return _score_patterns_and_type(url.lower())[1]
 
 
-def calculate_content_type_bonus(url: str) -> float:
+def calculate_content_type_bonus(content_type: str) -> float:
     """
     Bonus basé sur le type de contenu détecté
     Returns: 0-10 points
     """
-    content_type = detect_content_type(url)
-    
-    # Types prioritaires pour les IA
-    priority_types = ['faq', 'howto', 'article', 'recipe']
-    
-    if content_type in priority_types:
+    if content_type in _PRIORITY_CONTENT_TYPES:
         return 10
     elif content_type != 'unknown':
         return 5
@@ -169,26 +236,37 @@ def should_exclude_url(url: str) -> bool:
     Vérifie si l'URL doit être exclue
     """
     url_lower = url.lower()
-    
-    # Vérifier les patterns d'exclusion
-    if any(pattern in url_lower for pattern in EXCLUDE_PATTERNS):
+
+    # Vérifier les patterns d'exclusion (union précompilée, un seul scan)
+    if EXCLUDE_RE.search(url_lower):
         return True
-    
+
     # Vérifier les extensions à ignorer
-    if any(url_lower.endswith(ext) for ext in IGNORE_EXTENSIONS):
+    if IGNORE_EXTENSIONS_RE.search(url_lower):
         return True
-    
+
     return False
 
 
+# Maximum atteignable par les composantes calculées en dernier
+# (profondeur ≤ 20 + propreté ≤ 15) : sert de borne pour couper court
+_LATE_COMPONENTS_MAX = 35.0
+
+
 def pre_score_url(
     url: str,
     sitemap_priority: float = 0.5,
-    category_patterns: List[str] = None
+    category_patterns: List[str] = None,
+    min_score: float = 0
 ) -> Dict:
     """
     Calcule le score complet d'une URL
-    
+
+    Les composantes sont évaluées par contribution maximale décroissante
+    et l'URL est abandonnée dès que le plafond restant ne peut plus
+    atteindre min_score : sur un sitemap bruité, la plupart des URLs
+    rejetées le sont sans jamais parser leur chemin.
+
     Returns:
         {
             'url': str,
@@ -204,8 +282,11 @@ def pre_score_url(
             'should_exclude': bool
         }
     """
+    # Une seule mise en minuscules pour toute la passe
+    url_lower = url.lower()
+
     # Vérifier exclusion
-    if should_exclude_url(url):
+    if EXCLUDE_RE.search(url_lower) or IGNORE_EXTENSIONS_RE.search(url_lower):
         return {
             'url': url,
             'pre_score': 0,
@@ -213,30 +294,240 @@ def pre_score_url(
             'content_type': 'excluded',
             'should_exclude': True
         }
-    
-    # Calculer les composantes du score
+
+    # Passe fusionnée : patterns, type de contenu et bonus en un scan
+    pattern_score, content_type, content_type_bonus = \
+        _score_patterns_and_type(url_lower, category_patterns)
+    sitemap_score = calculate_sitemap_priority_score(sitemap_priority)
+
+    # Coupure par borne : même si profondeur et propreté sortaient
+    # leurs maxima, le score resterait sous min_score. round() est
+    # monotone, donc la comparaison arrondie est exactement celle que
+    # ferait le filtre aval sur le score complet
+    partial = pattern_score + content_type_bonus + sitemap_score
+    if round(partial + _LATE_COMPONENTS_MAX, 2) < min_score:
+        return {
+            'url': url,
+            'pre_score': 0,
+            'breakdown': {},
+            'content_type': content_type,
+            'should_exclude': True
+        }
+
+    # Calculer les composantes restantes du score
     breakdown = {
-        'pattern_match': calculate_pattern_match_score(url, category_patterns),
+        'pattern_match': pattern_score,
         'depth_optimal': calculate_depth_score(url),
         'url_cleanliness': calculate_cleanliness_score(url),
-        'sitemap_priority': calculate_sitemap_priority_score(sitemap_priority),
-        'content_type_bonus': calculate_content_type_bonus(url)
+        'sitemap_priority': sitemap_score,
+        'content_type_bonus': content_type_bonus
     }
-    
+
     # Score total pondéré
     total_score = sum(breakdown.values())
-    
+
     return {
         'url': url,
         'pre_score': round(total_score, 2),
         'breakdown': {k: round(v, 2) for k, v in breakdown.items()},
-        'content_type': detect_content_type(url),
+        'content_type': content_type,
         'should_exclude': False
     }
 
 
-def score_and_filter_urls(
+def _score_batch_scalar(
     discovered_urls: List[Dict],
+    category_patterns: List[str],
+    min_score: float
+) -> List[Dict]:
+    """Scoring URL par URL (repli quand NumPy est absent)"""
+    scored_urls = []
+
+    for url_data in discovered_urls:
+        score_result = pre_score_url(
+            url_data['url'], url_data.get('priority', 0.5), category_patterns,
+            min_score=min_score
+        )
+
+        # Ignorer si exclu ou score trop bas
+        if score_result['should_exclude'] or score_result['pre_score'] < min_score:
+            continue
+
+        # Ajouter les métadonnées du sitemap
+        score_result.update({
+            'lastmod': url_data.get('lastmod', ''),
+            'source': url_data.get('source', 'sitemap')
+        })
+        scored_urls.append(score_result)
+
+    return scored_urls
+
+
+def _score_kernel(depth_arr, params_arr, frag_arr, len_arr, track_arr,
+                  pattern_arr, bonus_arr, prio_arr):
+    """
+    Kernel numérique du scoring batch : uniquement de l'arithmétique
+    sur tableaux (barèmes, pénalités, clamps, somme pondérée)
+
+    Isolé pour être compilable tel quel par numba.njit quand numba est
+    installé ; sinon il s'exécute comme expressions NumPy vectorisées.
+
+    Returns:
+        (totals, depth_score, cleanliness, sitemap_score)
+    """
+    # Barème de profondeur (même logique que calculate_depth_score)
+    depth_score = np.where(
+        depth_arr < 0, 5.0,
+        np.where(
+            (depth_arr >= OPTIMAL_DEPTH_MIN) & (depth_arr <= OPTIMAL_DEPTH_MAX), 20.0,
+            np.where(
+                depth_arr < OPTIMAL_DEPTH_MIN, 10.0,
+                np.maximum(0.0, 15.0 - (depth_arr - OPTIMAL_DEPTH_MAX) * 3.0)
+            )
+        )
+    )
+
+    # Pénalités de propreté (même logique que calculate_cleanliness_score)
+    cleanliness = np.maximum(
+        15.0
+        - np.where(params_arr == 0, 0.0, np.where(params_arr <= 2, 3.0, 8.0))
+        - 2.0 * frag_arr
+        - np.where(len_arr > 150, 3.0, 0.0)
+        - 5.0 * track_arr,
+        0.0
+    )
+
+    sitemap_score = prio_arr * 15.0
+    totals = pattern_arr + depth_score + cleanliness + sitemap_score + bonus_arr
+
+    return totals, depth_score, cleanliness, sitemap_score
+
+
+if numba is not None:
+    _score_kernel = numba.njit(cache=True)(_score_kernel)
+
+
+def _score_batch_vectorized(
+    discovered_urls: List[Dict],
+    category_patterns: List[str],
+    min_score: float
+) -> List[Dict]:
+    """
+    Scoring d'un batch en deux phases
+
+    Phase 1 : une passe Python par URL limitée à l'extraction des
+    features (scans regex C, parse d'URL) dans des tableaux parallèles
+    — la liste de dicts est transposée en colonnes (une par feature)
+    le temps du calcul.
+    Phase 2 : toute l'arithmétique de scoring (barème de profondeur,
+    pénalités de propreté, clamps, somme) est vectorisée NumPy sur le
+    batch entier, et les dicts de résultat ne sont construits que pour
+    les URLs qui passent le seuil — pas d'allocations pour les rejetées
+    """
+    kept = []          # (url_data, url, content_type)
+    pattern_scores = []
+    bonuses = []
+    depths = []        # -1 = homepage
+    n_params = []
+    fragments = []
+    lengths = []
+    trackings = []
+    priorities = []
+
+    for url_data in discovered_urls:
+        url = url_data['url']
+        url_lower = url.lower()
+
+        # Exclusion : aucune feature extraite pour ces URLs
+        if EXCLUDE_RE.search(url_lower) or IGNORE_EXTENSIONS_RE.search(url_lower):
+            continue
+
+        try:
+            pattern_score, content_type, bonus = \
+                _score_patterns_and_type(url_lower, category_patterns)
+
+            path, query, fragment = _split_url(url)
+            path = path.strip('/')
+
+            pattern_scores.append(pattern_score)
+            bonuses.append(bonus)
+            depths.append(path.count('/') + 1 if path else -1)
+            n_params.append(query.count('=') if query else 0)
+            fragments.append(1 if fragment else 0)
+            lengths.append(len(url))
+            trackings.append(1 if _TRACKING_RE.search(url_lower) else 0)
+            priorities.append(url_data.get('priority', 0.5))
+            kept.append((url_data, url, content_type))
+        except Exception as e:
+            logger.debug(f"Erreur extraction features pour {url}: {e}")
+            continue
+
+    if not kept:
+        return []
+
+    pattern_arr = np.asarray(pattern_scores, dtype=np.float64)
+    bonus_arr = np.asarray(bonuses, dtype=np.float64)
+
+    totals, depth_score, cleanliness, sitemap_score = _score_kernel(
+        np.asarray(depths, dtype=np.int64),
+        np.asarray(n_params, dtype=np.int64),
+        np.asarray(fragments, dtype=np.float64),
+        np.asarray(lengths, dtype=np.int64),
+        np.asarray(trackings, dtype=np.float64),
+        pattern_arr,
+        bonus_arr,
+        np.asarray(priorities, dtype=np.float64),
+    )
+
+    scored_urls = []
+    for i in np.flatnonzero(np.round(totals, 2) >= min_score):
+        url_data, url, content_type = kept[i]
+        scored_urls.append({
+            'url': url,
+            'pre_score': round(float(totals[i]), 2),
+            'breakdown': {
+                'pattern_match': round(float(pattern_arr[i]), 2),
+                'depth_optimal': round(float(depth_score[i]), 2),
+                'url_cleanliness': round(float(cleanliness[i]), 2),
+                'sitemap_priority': round(float(sitemap_score[i]), 2),
+                'content_type_bonus': round(float(bonus_arr[i]), 2)
+            },
+            'content_type': content_type,
+            'should_exclude': False,
+            'lastmod': url_data.get('lastmod', ''),
+            'source': url_data.get('source', 'sitemap')
+        })
+
+    return scored_urls
+
+
+def stream_scored_urls(
+    discovered_urls: Iterable[Dict],
+    category_patterns: List[str] = None,
+    min_score: float = 40,
+    chunk_size: int = 1024
+) -> Iterator[Dict]:
+    """
+    Score un flux d'URLs découvertes et yield celles au-dessus du seuil
+
+    Le flux (par exemple SitemapParser.iter_urls) est consommé par
+    tranches de chunk_size : chaque tranche passe par le scoring batch
+    vectorisé (ou scalaire sans NumPy). Le consommateur reçoit les
+    premières URLs scorées dès la première tranche, sans attendre la
+    fin de la découverte, et la mémoire reste bornée par la tranche —
+    tout en conservant la vectorisation intra-tranche
+    """
+    score_batch = _score_batch_vectorized if np is not None else _score_batch_scalar
+    iterator = iter(discovered_urls)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from score_batch(chunk, category_patterns, min_score)
+
+
+def score_and_filter_urls(
+    discovered_urls: Iterable[Dict],
     category_patterns: List[str] = None,
     min_score: float = 40,
     max_urls: int = 100
@@ -253,37 +544,15 @@ def score_and_filter_urls(
     Returns:
         Liste des URLs scorées et filtrées, triées par score décroissant
     """
-    scored_urls = []
-    
-    for url_data in discovered_urls:
-        url = url_data['url']
-        sitemap_priority = url_data.get('priority', 0.5)
-        
-        # Scorer l'URL
-        score_result = pre_score_url(url, sitemap_priority, category_patterns)
-        
-        # Ignorer si exclu ou score trop bas
-        if score_result['should_exclude']:
-            continue
-        
-        if score_result['pre_score'] < min_score:
-            continue
-        
-        # Ajouter les métadonnées du sitemap
-        score_result.update({
-            'lastmod': url_data.get('lastmod', ''),
-            'source': url_data.get('source', 'sitemap')
-        })
-        
-        scored_urls.append(score_result)
-    
-    # Trier par score décroissant
-    scored_urls.sort(key=lambda x: x['pre_score'], reverse=True)
-    
-    # Limiter au nombre max
+    scored_urls = list(stream_scored_urls(discovered_urls, category_patterns, min_score))
+
+    # Top-K par score décroissant : O(N log K) via un tas de K éléments
+    # quand il faut tronquer, tri complet seulement si tout est gardé
     if len(scored_urls) > max_urls:
-        scored_urls = scored_urls[:max_urls]
-    
+        scored_urls = heapq.nlargest(max_urls, scored_urls, key=itemgetter('pre_score'))
+    else:
+        scored_urls.sort(key=itemgetter('pre_score'), reverse=True)
+
     logger.info(f"  {len(scored_urls)} URLs après scoring et filtrage (min_score={min_score})")
     
     return scored_urls
@@ -4,15 +4,42 @@ Module de validation JSON-LD
 
 import json
 import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
 from typing import Dict, List, Tuple, Any
+
+try:
+    import orjson  # Encode/décode 3-10x plus vite que le json stdlib
+except ImportError:
+    orjson = None
 from .config import REQUIRED_BASE_PROPERTIES, MIN_PROPERTIES_COUNT
-from .schema_rules import get_schema_rules, get_all_schema_types
+from .compiled_rules import get_checker
+from .schema_rules import (
+    get_schema_rules, get_all_schema_types,
+    SCHEMA_DEPTH, _specificity_from_parent_count
+)
 
 logger = logging.getLogger(__name__)
 
+# Types connus figés à l'import : un test d'appartenance O(1) par
+# document au lieu de reconstruire la liste des types à chaque appel.
+# Chaînes internées : les @type parsés étant internés eux aussi, les
+# comparaisons d'égalité des lookups se résolvent par identité de
+# pointeur sans parcourir les caractères
+_KNOWN_TYPES = frozenset(map(sys.intern, get_all_schema_types()))
+
 
 class ValidationResult:
-    """Résultat de validation avec détails"""
+    """Résultat de validation avec détails
+
+    __slots__ : trois instances sont allouées par bloc validé, autant
+    s'épargner le __dict__ par objet
+    """
+    __slots__ = ('is_valid', 'errors', 'warnings', 'info')
+
     def __init__(self):
         self.is_valid = False
         self.errors = []
@@ -62,6 +89,29 @@ def validate_json_syntax(json_ld: Any) -> ValidationResult:
     return result
 
 
+# Résultat syntaxe partagé par le rejet rapide de validate_full : pour
+# un dict, la passe syntaxe produit toujours exactement ce contenu.
+# Partagé entre tous les documents rejetés — ne jamais le muter
+_SYNTAX_OK_DICT = validate_json_syntax({})
+
+
+def _references_schema_org(context) -> bool:
+    """
+    Teste si un @context référence schema.org
+
+    Parcourt les trois formes canoniques (str, liste, dict) en
+    court-circuitant au premier hit, au lieu de stringifier et
+    minusculiser tout le bloc @context à chaque validation
+    """
+    if isinstance(context, str):
+        return 'schema.org' in context.lower()
+    if isinstance(context, list):
+        return any(_references_schema_org(item) for item in context)
+    if isinstance(context, dict):
+        return any(_references_schema_org(value) for value in context.values())
+    return False
+
+
 def validate_jsonld_structure(json_ld: Dict) -> ValidationResult:
     """
     Valide la structure de base JSON-LD
@@ -76,8 +126,9 @@ def validate_jsonld_structure(json_ld: Dict) -> ValidationResult:
         result.add_error("Propriété '@context' manquante")
     else:
         context = json_ld['@context']
-        # Vérifier que schema.org est référencé
-        if 'schema.org' not in str(context).lower():
+        # Vérifier que schema.org est référencé (parcours structurel,
+        # pas de stringification du bloc entier)
+        if not _references_schema_org(context):
             result.add_warning("@context ne référence pas schema.org explicitement")
         result.info['context'] = context
     
@@ -86,11 +137,16 @@ def validate_jsonld_structure(json_ld: Dict) -> ValidationResult:
         result.add_error("Propriété '@type' manquante")
     else:
         schema_type = json_ld['@type']
+        if isinstance(schema_type, str):
+            # json.loads n'interne pas ses chaînes : interner le type ici
+            # rend par identité tous les lookups aval (règles, checker
+            # compilé, scorer compilé, caches lru) sur cette clé
+            schema_type = sys.intern(schema_type)
         result.info['schema_type'] = schema_type
-        
-        # Vérifier si le type est connu
-        known_types = get_all_schema_types()
-        if schema_type not in known_types:
+
+        # Vérifier si le type est connu (frozenset précalculé ;
+        # un @type non-str — liste de types — reste non reconnu)
+        if not (isinstance(schema_type, str) and schema_type in _KNOWN_TYPES):
             result.add_warning(f"Type '{schema_type}' non reconnu dans nos règles (peut être valide)")
     
     # Vérifier le nombre minimum de propriétés
@@ -116,44 +172,24 @@ def validate_schema_properties(json_ld: Dict, schema_type: str) -> ValidationRes
     result = ValidationResult()
     
     rules = get_schema_rules(schema_type)
-    
-    # Vérifier les propriétés requises
-    missing_required = []
-    for prop in rules.get('required', []):
-        if prop not in json_ld:
-            missing_required.append(prop)
-    
+
+    # Checker compilé : tous les tests de présence et de type pour ce
+    # type sont déroulés en ligne droite dans une fonction spécialisée
+    missing_required, missing_recommended, type_mismatches = get_checker(schema_type)(json_ld)
+
     if missing_required:
         result.add_warning(f"Propriétés requises manquantes: {', '.join(missing_required)}")
-    
+
+    required_count = len(rules.get('required', ()))
     result.info['missing_required'] = missing_required
-    result.info['required_count'] = len(rules.get('required', []))
-    result.info['required_present'] = len(rules.get('required', [])) - len(missing_required)
-    
-    # Vérifier les propriétés recommandées
-    missing_recommended = []
-    for prop in rules.get('recommended', []):
-        if prop not in json_ld:
-            missing_recommended.append(prop)
-    
+    result.info['required_count'] = required_count
+    result.info['required_present'] = required_count - len(missing_required)
+
+    recommended_count = len(rules.get('recommended', ()))
     result.info['missing_recommended'] = missing_recommended
-    result.info['recommended_count'] = len(rules.get('recommended', []))
-    result.info['recommended_present'] = len(rules.get('recommended', [])) - len(missing_recommended)
-    
-    # Vérifier les types des propriétés imbriquées
-    type_mismatches = []
-    for prop, expected_types in rules.get('expected_types', {}).items():
-        if prop in json_ld:
-            value = json_ld[prop]
-            if isinstance(value, dict) and '@type' in value:
-                actual_type = value['@type']
-                if actual_type not in expected_types:
-                    type_mismatches.append({
-                        'property': prop,
-                        'expected': expected_types,
-                        'actual': actual_type
-                    })
-    
+    result.info['recommended_count'] = recommended_count
+    result.info['recommended_present'] = recommended_count - len(missing_recommended)
+
     if type_mismatches:
         for mismatch in type_mismatches:
             result.add_warning(
@@ -167,6 +203,114 @@ def validate_schema_properties(json_ld: Dict, schema_type: str) -> ValidationRes
     return result
 
 
+# Cache des sous-entités déjà analysées, borné en LRU : les mêmes
+# entités imbriquées (le publisher Organization répété sur toutes les
+# pages d'un site...) reviennent constamment d'un document à l'autre
+_NESTING_CACHE_MAX = 128
+_NESTING_CACHE = OrderedDict()
+_NESTING_LOCK = threading.Lock()
+
+
+def _nesting_key(obj: Dict):
+    """Empreinte de la forme canonique d'une sous-entité (None si non sérialisable)"""
+    try:
+        if orjson is not None:
+            payload = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        else:
+            payload = json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    except (TypeError, ValueError):
+        return None
+    return blake2b(payload, digest_size=12).digest()
+
+
+def _analyze_nesting(obj) -> Tuple[int, int]:
+    """
+    (hauteur, nombre d'entités) du sous-arbre, en relatif
+
+    Les grandeurs sont relatives à la racine du sous-arbre, ce qui les
+    rend indépendantes de la profondeur d'apparition — condition pour
+    pouvoir les mettre en cache par sous-entité.
+
+    Marche itérative sur pile explicite : pas de frame Python ni de
+    tuple de retour par nœud visité, les compteurs sont mis à jour en
+    place. Seuls les conteneurs sont empilés (les scalaires sont
+    comptabilisés inline) et les sous-entités typées passent par le
+    cache au lieu d'être re-parcourues. Les tests `__class__ is dict`
+    évitent la résolution MRO d'isinstance sur ce chemin très chaud
+    """
+    cls = obj.__class__
+    if cls is not dict and cls is not list:
+        return 0, 0
+
+    height = 0
+    entity_count = 0
+    stack = [(obj, 0)]
+
+    while stack:
+        node, depth = stack.pop()
+        if depth > height:
+            height = depth
+
+        if node.__class__ is dict:
+            if '@type' in node:
+                entity_count += 1
+            child_depth = depth + 1
+            for value in node.values():
+                vcls = value.__class__
+                if vcls is dict:
+                    if '@type' in value:
+                        sub_height, sub_count = _analyze_nesting_cached(value)
+                        if child_depth + sub_height > height:
+                            height = child_depth + sub_height
+                        entity_count += sub_count
+                    else:
+                        stack.append((value, child_depth))
+                elif vcls is list:
+                    stack.append((value, child_depth))
+                elif child_depth > height:
+                    height = child_depth
+        else:
+            for item in node:
+                icls = item.__class__
+                if icls is dict:
+                    if '@type' in item:
+                        sub_height, sub_count = _analyze_nesting_cached(item)
+                        if depth + sub_height > height:
+                            height = depth + sub_height
+                        entity_count += sub_count
+                    else:
+                        stack.append((item, depth))
+                elif icls is list:
+                    stack.append((item, depth))
+
+    return height, entity_count
+
+
+def _analyze_nesting_cached(obj) -> Tuple[int, int]:
+    """Analyse avec cache pour les sous-entités typées (dict avec @type)"""
+    if not (isinstance(obj, dict) and '@type' in obj):
+        return _analyze_nesting(obj)
+
+    key = _nesting_key(obj)
+    if key is None:
+        return _analyze_nesting(obj)
+
+    with _NESTING_LOCK:
+        cached = _NESTING_CACHE.get(key)
+        if cached is not None:
+            _NESTING_CACHE.move_to_end(key)
+            return cached
+
+    result = _analyze_nesting(obj)
+
+    with _NESTING_LOCK:
+        _NESTING_CACHE[key] = result
+        if len(_NESTING_CACHE) > _NESTING_CACHE_MAX:
+            _NESTING_CACHE.popitem(last=False)
+
+    return result
+
+
 def check_semantic_richness(json_ld: Dict) -> Dict:
     """
     Évalue la richesse sémantique du JSON-LD
@@ -207,29 +351,9 @@ def check_semantic_richness(json_ld: Dict) -> Dict:
             if any(source in same_as.lower() for source in QUALITY_SAME_AS_SOURCES):
                 richness['has_quality_links'] = True
     
-    # Compter les entités imbriquées et la profondeur
-    def analyze_nesting(obj, depth=0):
-        max_depth = depth
-        entity_count = 0
-        
-        if isinstance(obj, dict):
-            if '@type' in obj:
-                entity_count = 1
-            
-            for value in obj.values():
-                sub_depth, sub_count = analyze_nesting(value, depth + 1)
-                max_depth = max(max_depth, sub_depth)
-                entity_count += sub_count
-                
-        elif isinstance(obj, list):
-            for item in obj:
-                sub_depth, sub_count = analyze_nesting(item, depth)
-                max_depth = max(max_depth, sub_depth)
-                entity_count += sub_count
-        
-        return max_depth, entity_count
-    
-    richness['nested_depth'], richness['nested_entities_count'] = analyze_nesting(json_ld)
+    # Compter les entités imbriquées et la profondeur (les sous-entités
+    # déjà vues sont servies depuis le cache)
+    richness['nested_depth'], richness['nested_entities_count'] = _analyze_nesting(json_ld)
     
     return richness
 
@@ -242,24 +366,26 @@ def get_type_specificity_score(schema_type: str) -> int:
     Returns:
         Score de 0 à 10
     """
+    # Table précalculée à l'import pour tous les types connus
+    score = SCHEMA_DEPTH.get(schema_type)
+    if score is not None:
+        return score
+
+    # Type inconnu : mesurer la hiérarchie des règles de fallback
     rules = get_schema_rules(schema_type)
-    parent_count = len(rules.get('parent_types', []))
-    
-    # Plus il y a de parents, plus le type est spécifique
-    if parent_count >= 3:
-        return 10
-    elif parent_count == 2:
-        return 7
-    elif parent_count == 1:
-        return 4
-    else:
-        return 1
+    return _specificity_from_parent_count(len(rules.get('parent_types', ())))
 
 
 def validate_full(json_ld: Dict) -> Tuple[bool, Dict]:
     """
     Validation complète d'un JSON-LD
-    
+
+    Les entrées syntax/structure/properties des détails sont des
+    ValidationResult (pas des dicts) : les blocs candidats qui ne
+    finissent jamais dans un rapport ne paient aucune conversion.
+    serializable_details() produit la forme JSON à la frontière des
+    rapports.
+
     Returns:
         (is_valid, validation_details)
     """
@@ -271,31 +397,41 @@ def validate_full(json_ld: Dict) -> Tuple[bool, Dict]:
         'schema_type': None,
         'specificity_score': 0
     }
-    
+
+    # Rejet rapide : un dict sans @context ou sans @type échouera à la
+    # validation de structure quoi qu'il arrive. Deux tests d'appartenance
+    # O(1) suffisent à le savoir — la passe syntaxe (triviale pour un
+    # dict) est remplacée par son résultat partagé et seule la passe
+    # structure tourne, pour des détails identiques au chemin complet
+    if isinstance(json_ld, dict) and ('@context' not in json_ld or '@type' not in json_ld):
+        details['syntax'] = _SYNTAX_OK_DICT
+        details['structure'] = validate_jsonld_structure(json_ld)
+        return False, details
+
     # 1. Validation syntaxique
     syntax_result = validate_json_syntax(json_ld)
-    details['syntax'] = syntax_result.to_dict()
-    
+    details['syntax'] = syntax_result
+
     if not syntax_result.is_valid:
         return False, details
-    
+
     # Si c'était une liste, on prend le premier élément
     if isinstance(json_ld, list):
         json_ld = json_ld[0]
-    
+
     # 2. Validation structure JSON-LD
     structure_result = validate_jsonld_structure(json_ld)
-    details['structure'] = structure_result.to_dict()
-    
+    details['structure'] = structure_result
+
     if not structure_result.is_valid:
         return False, details
-    
+
     schema_type = structure_result.info.get('schema_type', 'Thing')
     details['schema_type'] = schema_type
-    
+
     # 3. Validation propriétés Schema.org
     properties_result = validate_schema_properties(json_ld, schema_type)
-    details['properties'] = properties_result.to_dict()
+    details['properties'] = properties_result
     
     # 4. Analyse richesse sémantique
     richness = check_semantic_richness(json_ld)
@@ -303,5 +439,46 @@ def validate_full(json_ld: Dict) -> Tuple[bool, Dict]:
     
     # 5. Score de spécificité
     details['specificity_score'] = get_type_specificity_score(schema_type)
-    
+
     return True, details
+
+
+def serializable_details(details: Dict) -> Dict:
+    """
+    Copie des détails de validation prête pour la sérialisation JSON
+
+    Convertit les ValidationResult en dicts, une seule fois et seulement
+    pour les résultats effectivement écrits dans un rapport. Les autres
+    valeurs (richness, schema_type...) sont déjà sérialisables et sont
+    reprises telles quelles
+    """
+    converted = dict(details)
+    for key in ('syntax', 'structure', 'properties'):
+        value = converted.get(key)
+        if isinstance(value, ValidationResult):
+            converted[key] = value.to_dict()
+    return converted
+
+
+def validate_batch(docs: List[Dict], max_workers: int = None) -> List[Tuple[bool, Dict]]:
+    """
+    Valide un lot de documents en parallèle sur plusieurs processus
+
+    La validation est purement CPU (lookups dict, comparaisons de
+    chaînes) : le GIL empêche les threads d'en tirer plusieurs cœurs,
+    d'où un ProcessPoolExecutor. chunksize amortit le coût de pickling
+    par tâche, et les tables de règles étant construites à l'import,
+    chaque worker les recrée une fois au fork sans re-sérialisation.
+    Les petits lots restent en séquentiel : démarrer un pool coûterait
+    plus cher que la validation elle-même.
+
+    Returns:
+        [(is_valid, validation_details), ...] dans l'ordre des docs
+    """
+    if len(docs) <= 64:
+        return [validate_full(doc) for doc in docs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        return list(pool.map(validate_full, docs, chunksize=64))
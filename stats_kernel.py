@@ -0,0 +1,36 @@
+"""
+Kernel de réduction des pre-scores pour les scripts de test
+
+La boucle pure-numérique est compilée par numba.njit quand numba est
+installé (cache=True : le binaire est conservé entre les runs, le coût
+de compilation n'est payé qu'une fois par machine). Sans numba, les
+réductions vectorisées NumPy font le même travail en C.
+"""
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _reduce_scores_loop(arr):
+    """(moyenne, max, min) par boucle scalaire — la forme que njit compile"""
+    total = 0.0
+    score_max = -1e30
+    score_min = 1e30
+    for i in range(arr.shape[0]):
+        value = arr[i]
+        total += value
+        if value > score_max:
+            score_max = value
+        if value < score_min:
+            score_min = value
+    return total / arr.shape[0], score_max, score_min
+
+
+if njit is not None:
+    reduce_scores = njit(cache=True, fastmath=True)(_reduce_scores_loop)
+else:
+    def reduce_scores(arr):
+        """(moyenne, max, min) via les réductions NumPy (repli sans numba)"""
+        return float(arr.mean()), float(arr.max()), float(arr.min())
